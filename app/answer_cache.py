@@ -0,0 +1,238 @@
+"""
+HemaV MedAssist — Precomputed Answers for Hot Queries
+
+Traffic is heavy-tailed: a few hundred question variants cover most requests.
+An offline job mines logs/retrieval_log.jsonl, clusters the logged queries
+by embedding, and runs the full RAG pipeline once for each hot cluster's
+representative question. The server answers matching questions straight
+from this lookup — no retrieval, no LLM call.
+
+Matching (in order):
+1. Normalized text of a logged cluster member whose own cosine to the
+   representative is within ANSWER_CACHE_THRESHOLD → exact hit (members that
+   only joined at the looser clustering threshold are not served by text)
+2. Query embedding within ANSWER_CACHE_THRESHOLD cosine of a representative
+
+Invalidation: the cache file records the index version it was built against
+(endee_integration.indexer.write_index_version, bumped on every ingestion and
+snapshot restore). A cache built for another version is never served, and
+the server notices new cache/index versions on disk without a restart.
+"""
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+import numpy as np
+from config import ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD, INDEX_VERSION_PATH, LOGS_DIR, EMBEDDING_MODEL
+from endee_integration.indexer import read_index_version
+
+logger = logging.getLogger("hemav.app.answer_cache")
+
+FORMAT_VERSION = 2
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form for exact matching: lowercase, collapsed whitespace, no trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class AnswerCache:
+    """Index-version-bound lookup of precomputed answers."""
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._stamp = None
+        self._entries: list[dict] = []
+        self._by_text: dict[str, int] = {}
+        self._embeddings = np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._entries)
+
+    def _refresh(self):
+        """(Re)load when the cache file or the index version changed on disk."""
+        stamp = (_mtime(self.path), _mtime(INDEX_VERSION_PATH))
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        self._entries, self._by_text = [], {}
+        self._embeddings = np.empty((0, 0), dtype=np.float32)
+
+        if stamp[0] is None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable answer cache {self.path}: {e}")
+            return
+
+        index_version = read_index_version()
+        if (data.get("format_version") != FORMAT_VERSION
+                or data.get("embedding_model") != EMBEDDING_MODEL
+                or index_version is None
+                or data.get("index_version") != index_version):
+            logger.info(f"Answer cache built for index version {data.get('index_version')!r}, "
+                        f"current is {index_version!r} — not serving it")
+            return
+
+        self._entries = data["entries"]
+        # Same gate as match_embedding: a member is only an alias if it is as close as we'd serve
+        self._by_text = {
+            normalize_question(member["question"]): i
+            for i, entry in enumerate(self._entries)
+            for member in entry["members"]
+            if member["similarity"] >= self.threshold
+        }
+        self._embeddings = np.asarray([e["embedding"] for e in self._entries], dtype=np.float32)
+        logger.info(f"Loaded {len(self._entries)} precomputed answers (index version {index_version})")
+
+    def match_text(self, question: str) -> dict | None:
+        """Exact (normalized) match against the logged phrasings close enough to a hot query."""
+        self._refresh()
+        i = self._by_text.get(normalize_question(question))
+        return self._entries[i] if i is not None else None
+
+    def match_embedding(self, embedding) -> dict | None:
+        """Nearest representative question, if within the similarity threshold."""
+        self._refresh()
+        if not self._entries:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = self._embeddings @ (query / (np.linalg.norm(query) or 1.0))
+        best = int(np.argmax(scores))
+        return self._entries[best] if scores[best] >= self.threshold else None
+
+
+_cache = None  # Lazy-loaded singleton
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        _cache = AnswerCache()
+    return _cache
+
+
+# ── Offline build job ───────────────────────────────────────
+
+def load_logged_queries(log_file: str = None) -> Counter:
+    """Count logged queries by normalized text (keeping the most common raw phrasing)."""
+    log_file = log_file or os.path.join(LOGS_DIR, "retrieval_log.jsonl")
+    phrasings: dict[str, Counter] = {}
+    if os.path.exists(log_file):
+        with open(log_file, "r") as f:
+            for line in f:
+                try:
+                    query = json.loads(line)["query"]
+                except (ValueError, KeyError):
+                    continue
+                phrasings.setdefault(normalize_question(query), Counter())[query.strip()] += 1
+
+    return Counter({
+        variants.most_common(1)[0][0]: sum(variants.values())
+        for variants in phrasings.values()
+    })
+
+
+def cluster_queries(counts: Counter, embeddings: np.ndarray, threshold: float) -> list[dict]:
+    """
+    Greedy leader clustering, most frequent query first: each query joins the
+    first existing cluster whose leader is within `threshold` cosine, else it
+    leads a new one. Leaders are therefore the most frequent phrasing.
+
+    Returns:
+        Clusters sorted by total frequency: dicts with leader, embedding, count and
+        members ({question, similarity} — cosine to the leader)
+    """
+    queries = list(counts)
+    order = sorted(range(len(queries)), key=lambda i: -counts[queries[i]])
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+
+    clusters, leader_rows = [], []
+    for i in order:
+        if leader_rows:
+            scores = embeddings[leader_rows] @ embeddings[i]
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                clusters[best]["members"].append({"question": queries[i], "similarity": float(scores[best])})
+                clusters[best]["count"] += counts[queries[i]]
+                continue
+        leader_rows.append(i)
+        clusters.append({
+            "leader": queries[i],
+            "embedding": embeddings[i],
+            "members": [{"question": queries[i], "similarity": 1.0}],
+            "count": counts[queries[i]],
+        })
+
+    return sorted(clusters, key=lambda c: -c["count"])
+
+
+def build_answer_cache(top_n: int = 200, cluster_threshold: float = 0.9, min_count: int = 2,
+                       api_key: str = None, path: str = ANSWER_CACHE_PATH) -> dict:
+    """
+    Mine the retrieval log and precompute answers for the `top_n` hottest
+    query clusters seen at least `min_count` times, against the current index.
+    """
+    from embeddings.generator import get_model
+    from endee_integration.retriever import retrieve, build_context
+    from app.llm import generate_answer
+
+    index_version = read_index_version()
+    if index_version is None:
+        raise RuntimeError("No index version recorded — run ingestion (or restore a snapshot) first")
+
+    counts = load_logged_queries()
+    if not counts:
+        raise RuntimeError("Retrieval log is empty — nothing to precompute")
+
+    embeddings = get_model().encode(list(counts), convert_to_numpy=True)
+    clusters = [c for c in cluster_queries(counts, embeddings, cluster_threshold) if c["count"] >= min_count]
+    logger.info(f"{len(counts)} distinct queries → {len(clusters)} clusters with ≥{min_count} hits; "
+                f"warming top {min(top_n, len(clusters))}")
+
+    entries = []
+    for cluster in clusters[:top_n]:
+        question = cluster["leader"]
+        results = retrieve(question, query_embedding=cluster["embedding"].tolist(), log=False)
+        answer = generate_answer(question, build_context(results), api_key)
+        if answer.startswith("❌"):
+            logger.warning(f"Skipping '{question[:50]}': {answer.splitlines()[0]}")
+            continue
+        entries.append({
+            "question": question,
+            "answer": answer,
+            "sources": results,
+            "members": cluster["members"],
+            "count": cluster["count"],
+            "embedding": cluster["embedding"].tolist(),
+        })
+
+    cache = {
+        "format_version": FORMAT_VERSION,
+        "index_version": index_version,
+        "embedding_model": EMBEDDING_MODEL,
+        "created_at": datetime.now().isoformat(),
+        "cluster_threshold": cluster_threshold,
+        "entries": entries,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+    covered = sum(e["count"] for e in entries)
+    logger.info(f"Wrote {len(entries)} precomputed answers covering {covered}/{sum(counts.values())} logged queries")
+    return cache
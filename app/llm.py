@@ -12,7 +12,7 @@ Why RAG reduces hallucination:
 """
 import logging
 from groq import Groq
-from config import GROQ_API_KEY, LLM_MODEL, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
+from config import GROQ_API_KEY, GROQ_BASE_URL, LLM_MODEL, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
 
 logger = logging.getLogger("hemav.app.llm")
 
@@ -22,7 +22,7 @@ def get_groq_client(custom_api_key: str = None) -> Groq:
     key = custom_api_key if custom_api_key else GROQ_API_KEY
     if not key:
         raise ValueError("No Groq API key found. Please provide one in the UI or .env")
-    return Groq(api_key=key)
+    return Groq(api_key=key, base_url=GROQ_BASE_URL)
 
 
 def generate_answer(question: str, context: str, api_key: str = None) -> str:
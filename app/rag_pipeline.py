@@ -8,7 +8,9 @@ This is textbook RAG — the industry standard approach for grounding
 LLM responses in actual documents while minimizing hallucination.
 """
 import logging
-from endee_integration.retriever import retrieve, build_context
+from embeddings.generator import generate_single_embedding
+from endee_integration.retriever import retrieve, build_context, log_retrieval
+from app.answer_cache import get_answer_cache
 from app.llm import generate_answer
 
 logger = logging.getLogger("hemav.app.rag")
@@ -22,6 +24,7 @@ class RAGPipeline:
         Process a user question through the full RAG pipeline.
 
         Pipeline:
+        0. Serve a precomputed answer if the question matches a hot query
         1. Embed query using Sentence Transformers
         2. Search Endee for top-k similar medical document chunks
         3. Build context string with source attribution
@@ -29,12 +32,30 @@ class RAGPipeline:
         5. Return answer with sources and confidence scores
 
         Returns:
-            dict with: question, answer, sources, context_used
+            dict with: question, answer, sources, context_used, cached
         """
         logger.info(f"RAG query: '{question[:80]}...'")
 
+        # Step 0: Precomputed answers for hot queries (exact text first, then embedding)
+        query_embedding = None
+        cache = get_answer_cache()
+        entry = cache.match_text(question)
+        if entry is None and len(cache):
+            query_embedding = generate_single_embedding(question)
+            entry = cache.match_embedding(query_embedding)
+        if entry is not None:
+            logger.info(f"Served precomputed answer for hot query '{entry['question'][:50]}...'")
+            log_retrieval(question, entry["sources"], cached=True)
+            return {
+                "question": question,
+                "answer": entry["answer"],
+                "sources": entry["sources"],
+                "context_used": build_context(entry["sources"]),
+                "cached": True,
+            }
+
         # Step 1 & 2: Retrieve relevant chunks from Endee
-        results = retrieve(question)
+        results = retrieve(question, query_embedding=query_embedding)
         logger.info(f"Retrieved {len(results)} chunks from Endee")
 
         # Step 3: Build context string
@@ -49,4 +70,5 @@ class RAGPipeline:
             "answer": answer,
             "sources": results,
             "context_used": context,
+            "cached": False,
         }
@@ -3,11 +3,12 @@ HemaV MedAssist — FastAPI Web Application
 
 Serves the premium web UI and provides API endpoints for:
 - RAG queries (semantic search + LLM answer generation)
-- Health checks (Endee connection status)
+- Health checks (Endee connection + per-shard status)
 """
 import logging
 import markdown
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -63,6 +64,7 @@ async def query(req: QueryRequest):
             "answer_raw": result["answer"],
             "sources": result["sources"],
             "question": result["question"],
+            "cached": result["cached"],
         }
     except Exception as e:
         logger.error(f"Query error: {e}")
@@ -71,19 +73,25 @@ async def query(req: QueryRequest):
 
 @app.get("/api/health")
 async def health():
-    """Health check — verifies Endee connection."""
+    """Health check — verifies Endee connection and reports per-shard status."""
+    from endee_integration.sharding import all_shard_stats
+    shards = await run_in_threadpool(all_shard_stats)  # a dead host must not block the event loop
+    healthy = sum(1 for s in shards if s["status"] == "healthy")
+
     try:
         from endee_integration.indexer import get_client
         client = get_client()
-        indexes = client.list_indexes()
+        indexes = await run_in_threadpool(client.list_indexes)
         return {
-            "status": "healthy",
+            "status": "healthy" if healthy == len(shards) else "degraded",
             "endee_connected": True,
             "indexes": len(indexes),
+            "shards": shards,
         }
     except Exception as e:
         return {
             "status": "degraded",
             "endee_connected": False,
             "error": str(e),
+            "shards": shards,
         }
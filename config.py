@@ -9,6 +9,7 @@ load_dotenv()
 
 # ── Groq LLM ────────────────────────────────────────────────
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None  # None = Groq's public API
 LLM_MODEL = "llama-3.3-70b-versatile"
 
 # ── Endee Vector DB ─────────────────────────────────────────
@@ -16,6 +17,19 @@ ENDEE_HOST = os.getenv("ENDEE_HOST", "http://localhost:8080")
 ENDEE_AUTH_TOKEN = os.getenv("ENDEE_AUTH_TOKEN", "")
 INDEX_NAME = "hemav_medical_docs"
 
+# ── Sharding ────────────────────────────────────────────────
+# NUM_SHARDS > 1 splits the corpus into "<INDEX_NAME>_s<i>" indexes spread over ENDEE_SHARD_HOSTS
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", "1"))
+ENDEE_SHARD_HOSTS = [h.strip() for h in os.getenv("ENDEE_SHARD_HOSTS", "").split(",") if h.strip()]
+SHARD_KEY = os.getenv("SHARD_KEY", "hash")  # "hash" (by chunk id) | "source" (by document)
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", "2.0"))  # seconds per shard search
+
+# ── Retrieval backend ───────────────────────────────────────
+# "endee": Endee only | "local": in-process exact search | "auto": Endee, local on connection errors
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "auto")
+ENDEE_RETRY_AFTER = float(os.getenv("ENDEE_RETRY_AFTER", "30"))  # "auto": seconds to stay on local after an outage
+LOCAL_INDEX_PRECISION = os.getenv("LOCAL_INDEX_PRECISION", "float32")  # on-disk dtype: float32 | float16
+
 # ── Embedding ───────────────────────────────────────────────
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
@@ -24,12 +38,19 @@ EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
 TOP_K = int(os.getenv("TOP_K", "5"))
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # min cosine to serve a precomputed answer
 
 # ── Paths ───────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 MEDICAL_DOCS_DIR = os.path.join(BASE_DIR, "data", "medical_docs")
-LOGS_DIR = os.path.join(BASE_DIR, "logs")
+LOGS_DIR = os.getenv("LOGS_DIR", os.path.join(BASE_DIR, "logs"))
+CHUNK_TABLE_PATH = os.getenv("CHUNK_TABLE_PATH", os.path.join(BASE_DIR, "data", "chunks.npz"))
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", os.path.join(BASE_DIR, "embedding_store"))
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(BASE_DIR, "local_index"))
+INDEX_VERSION_PATH = os.getenv("INDEX_VERSION_PATH", os.path.join(BASE_DIR, "index_version.json"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(BASE_DIR, "answer_cache.json"))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(BASE_DIR, "snapshots"))
 
 # ── System Prompt ───────────────────────────────────────────
 SYSTEM_PROMPT = """You are HemaV MedAssist, an AI-powered medical knowledge assistant specializing in hematology and anemia-related topics.
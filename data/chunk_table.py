@@ -0,0 +1,236 @@
+"""
+HemaV MedAssist — Columnar Chunk Table
+
+Compact storage for the chunks produced by ingestion. Instead of one dict per
+chunk (each repeating the source filename and an f-string id), a ChunkTable
+keeps a handful of flat columns:
+
+- text:        every chunk's UTF-8 bytes in one uint8 buffer
+- offsets:     int64 [N+1] — chunk i is text[offsets[i]:offsets[i+1]]
+- source_ids:  int32 [N] — index into `sources` (each filename stored once)
+- pages:       int32 [N] — page number in the source document
+- page_chunks: int32 [N] — chunk number within its page (the "c" in the id)
+
+Memory therefore scales with the amount of text, not the number of Python
+objects. Rows are exposed as lazy, read-only ChunkView mappings with the same
+keys as the old chunk dicts (id, text, page, source, chunk_index), so code
+written against dicts keeps working.
+
+A table serializes to a single .npz file readable by anything with NumPy.
+"""
+import logging
+from array import array
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+logger = logging.getLogger("hemav.data.chunk_table")
+
+FORMAT_VERSION = 1
+_KEYS = ("id", "text", "page", "source", "chunk_index")
+
+
+class ChunkView(Mapping):
+    """Read-only dict-like view of one row of a ChunkTable."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "ChunkTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str):
+        t, i = self._table, self._row
+        if key == "text":
+            return t.text(i)
+        if key == "source":
+            return t.sources[t.source_ids[i]]
+        if key == "page":
+            return int(t.pages[i])
+        if key == "chunk_index":
+            return i
+        if key == "id":
+            return t.chunk_id(i)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(_KEYS)
+
+    def __len__(self) -> int:
+        return len(_KEYS)
+
+    def __repr__(self) -> str:
+        return f"ChunkView({self._table.chunk_id(self._row)!r})"
+
+
+class _TextColumn(Sequence):
+    """Lazy sequence of chunk texts (decoded on access)."""
+
+    def __init__(self, table: "ChunkTable"):
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._table.text(j) for j in range(*i.indices(len(self)))]
+        return self._table.text(i)
+
+
+class ChunkTable(Sequence):
+    """Columnar, immutable table of chunks."""
+
+    def __init__(self, text: np.ndarray, offsets: np.ndarray, sources: list[str],
+                 source_ids: np.ndarray, pages: np.ndarray, page_chunks: np.ndarray):
+        self._text = text
+        self.offsets = offsets
+        self.sources = sources
+        self.source_ids = source_ids
+        self.pages = pages
+        self.page_chunks = page_chunks
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ChunkView(self, j) for j in range(*i.indices(len(self)))]
+        return ChunkView(self, self._row(i))
+
+    def _row(self, i: int) -> int:
+        """Normalize a possibly negative row index, bounds-checked."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        return i
+
+    # ── Column access ───────────────────────────────────────
+
+    def text(self, i: int) -> str:
+        i = self._row(i)
+        return self._text[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    @property
+    def texts(self) -> _TextColumn:
+        """All chunk texts as a lazy sequence (e.g. for generate_embeddings)."""
+        return _TextColumn(self)
+
+    def chunk_id(self, i: int) -> str:
+        """Stable chunk id: "<source>_p<page>_c<chunk-in-page>"."""
+        return f"{self.sources[self.source_ids[i]]}_p{self.pages[i]}_c{self.page_chunks[i]}"
+
+    def id_keys(self, sources: list[str]) -> np.ndarray:
+        """
+        int64 key per row that is equal across tables exactly when chunk ids
+        are equal, given a shared `sources` list (rows whose source is not
+        in it get -1). Lets tables be matched by id without building N strings.
+        """
+        position = {source: i for i, source in enumerate(sources)}
+        source_map = np.array([position.get(s, -1) for s in self.sources] or [0], dtype=np.int64)
+        src = source_map[self.source_ids]
+        keys = (src << 42) | (self.pages.astype(np.int64) << 21) | self.page_chunks.astype(np.int64)
+        keys[src < 0] = -1
+        return keys
+
+    def take(self, rows) -> "ChunkTable":
+        """New table with only `rows` (in that order); text is gathered without decoding."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1], dtype=np.int64)
+        return ChunkTable(self._text[gather], offsets, list(self.sources), self.source_ids[rows],
+                          self.pages[rows], self.page_chunks[rows])
+
+    @classmethod
+    def concat(cls, tables: list["ChunkTable"]) -> "ChunkTable":
+        """Rows of all `tables` (at least one), in order, with their source lists merged."""
+        sources: dict[str, int] = {}
+        source_ids = []
+        for t in tables:
+            source_map = np.array([sources.setdefault(s, len(sources)) for s in t.sources] or [0], dtype=np.int32)
+            source_ids.append(source_map[t.source_ids])
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for t in tables:
+            offsets.append(t.offsets[1:] + base)
+            base += int(t.offsets[-1])
+        return cls(
+            text=np.concatenate([t._text for t in tables]),
+            offsets=np.concatenate(offsets),
+            sources=list(sources),
+            source_ids=np.concatenate(source_ids),
+            pages=np.concatenate([t.pages for t in tables]),
+            page_chunks=np.concatenate([t.page_chunks for t in tables]),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self._text, self.offsets, self.source_ids, self.pages, self.page_chunks))
+
+    # ── Serialization ───────────────────────────────────────
+
+    def save(self, path: str):
+        """Write the table to a single .npz file."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                format_version=np.array(FORMAT_VERSION),
+                text=self._text,
+                offsets=self.offsets,
+                sources=np.array(self.sources, dtype=str),
+                source_ids=self.source_ids,
+                pages=self.pages,
+                page_chunks=self.page_chunks,
+            )
+        logger.info(f"Saved chunk table ({len(self)} chunks, {self.nbytes} bytes) to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkTable":
+        with np.load(path) as data:
+            version = int(data["format_version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported chunk table format {version} in {path}")
+            return cls(
+                text=data["text"],
+                offsets=data["offsets"],
+                sources=data["sources"].tolist(),
+                source_ids=data["source_ids"],
+                pages=data["pages"],
+                page_chunks=data["page_chunks"],
+            )
+
+
+class ChunkTableBuilder:
+    """Append-only builder; growth uses compact stdlib arrays, not Python objects."""
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = array("q", [0])
+        self._source_index: dict[str, int] = {}
+        self._source_ids = array("i")
+        self._pages = array("i")
+        self._page_chunks = array("i")
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def append(self, text: str, source: str, page: int, page_chunk: int):
+        source_id = self._source_index.setdefault(source, len(self._source_index))
+        self._text += text.encode("utf-8")
+        self._offsets.append(len(self._text))
+        self._source_ids.append(source_id)
+        self._pages.append(page)
+        self._page_chunks.append(page_chunk)
+
+    def build(self) -> ChunkTable:
+        return ChunkTable(
+            text=np.frombuffer(bytes(self._text), dtype=np.uint8),
+            offsets=np.frombuffer(self._offsets, dtype=np.int64).copy(),
+            sources=list(self._source_index),
+            source_ids=np.frombuffer(self._source_ids, dtype=np.int32).copy(),
+            pages=np.frombuffer(self._pages, dtype=np.int32).copy(),
+            page_chunks=np.frombuffer(self._page_chunks, dtype=np.int32).copy(),
+        )
@@ -10,7 +10,9 @@ Why chunk size matters:
   * Keeps chunks focused enough for precise retrieval
 """
 import logging
+from collections.abc import Iterable
 from config import CHUNK_SIZE, CHUNK_OVERLAP
+from data.chunk_table import ChunkTable, ChunkTableBuilder
 
 logger = logging.getLogger("hemav.data.chunker")
 
@@ -43,24 +45,27 @@ def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVE
     return chunks
 
 
-def chunk_pages(pages: list[dict]) -> list[dict]:
+def build_chunk_table(pages: Iterable[dict]) -> ChunkTable:
     """
-    Chunk a list of page dicts, preserving metadata for source attribution.
+    Chunk a stream of page dicts into a columnar ChunkTable.
+    Pages are consumed one at a time, so they can come from a generator.
     """
-    all_chunks = []
-    chunk_id = 0
+    builder = ChunkTableBuilder()
+    num_pages = 0
 
     for page in pages:
-        text_chunks = chunk_text(page["text"])
-        for i, chunk in enumerate(text_chunks):
-            all_chunks.append({
-                "id": f"{page['source']}_p{page['page']}_c{i}",
-                "text": chunk,
-                "page": page["page"],
-                "source": page["source"],
-                "chunk_index": chunk_id,
-            })
-            chunk_id += 1
+        for i, chunk in enumerate(chunk_text(page["text"])):
+            builder.append(chunk, page["source"], page["page"], i)
+        num_pages += 1
+
+    table = builder.build()
+    logger.info(f"Created {len(table)} chunks from {num_pages} pages ({table.nbytes} bytes)")
+    return table
+
 
-    logger.info(f"Created {len(all_chunks)} chunks from {len(pages)} pages")
-    return all_chunks
+def chunk_pages(pages: list[dict]) -> list[dict]:
+    """
+    Chunk a list of page dicts, preserving metadata for source attribution.
+    Returns plain dicts; prefer build_chunk_table() for large corpora.
+    """
+    return [dict(chunk) for chunk in build_chunk_table(pages)]
@@ -4,6 +4,7 @@ Extracts text from PDF files page-by-page with source metadata.
 """
 import os
 import logging
+from collections.abc import Iterator
 from PyPDF2 import PdfReader
 
 logger = logging.getLogger("hemav.data.pdf_parser")
@@ -63,19 +64,25 @@ def extract_text_from_txt(txt_path: str) -> list[dict]:
     return segments
 
 
-def extract_from_directory(dir_path: str) -> list[dict]:
-    """Extract text from all PDFs and TXT files in a directory."""
-    all_pages = []
+def iter_directory_pages(dir_path: str) -> Iterator[dict]:
+    """
+    Yield pages from all PDFs and TXT files in a directory, one file at a time,
+    so only a single document's pages are held in memory.
+    """
     if not os.path.isdir(dir_path):
         logger.warning(f"Directory not found: {dir_path}")
-        return all_pages
+        return
 
     for fname in sorted(os.listdir(dir_path)):
         fpath = os.path.join(dir_path, fname)
         if fname.lower().endswith(".pdf"):
-            all_pages.extend(extract_text_from_pdf(fpath))
+            yield from extract_text_from_pdf(fpath)
         elif fname.lower().endswith(".txt"):
-            all_pages.extend(extract_text_from_txt(fpath))
+            yield from extract_text_from_txt(fpath)
 
+
+def extract_from_directory(dir_path: str) -> list[dict]:
+    """Extract text from all PDFs and TXT files in a directory."""
+    all_pages = list(iter_directory_pages(dir_path))
     logger.info(f"Total pages extracted from directory: {len(all_pages)}")
     return all_pages
@@ -9,13 +9,20 @@ Why this model:
 - Trained on 1B+ sentence pairs for semantic similarity
 - Fast inference (~14K sentences/sec on GPU)
 - Ideal for cosine similarity search
+
+Corpus embeddings go through the content-addressed EmbeddingStore
+(embeddings/store.py): only chunk texts never seen before hit the model.
 """
 import logging
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from config import EMBEDDING_MODEL
+from embeddings.store import content_key, get_store
 
 logger = logging.getLogger("hemav.embeddings")
 
+STORE_BATCH_SIZE = 1024  # texts hashed / encoded / appended per step
+
 _model = None  # Lazy-loaded singleton
 
 
@@ -29,11 +36,43 @@ def get_model() -> SentenceTransformer:
     return _model
 
 
-def generate_embeddings(texts: list[str]) -> list[list[float]]:
-    """Generate embeddings for a batch of texts."""
-    model = get_model()
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
-    return embeddings.tolist()
+def generate_embeddings(texts, use_store: bool = True, batch_size: int = STORE_BATCH_SIZE) -> np.ndarray:
+    """
+    Generate embeddings for a sequence of texts as a (len(texts), dim) float32 array.
+
+    With use_store=True, texts are processed `batch_size` at a time: vectors
+    already in the embedding store are looked up, only new texts are encoded,
+    and they are appended before the next batch. Only row numbers are kept
+    across batches, and the result is read back from the store's memmap
+    (zero-copy when rows are contiguous).
+    """
+    if not use_store:
+        model = get_model()
+        return model.encode(list(texts), show_progress_bar=True, convert_to_numpy=True).astype(np.float32, copy=False)
+
+    store = get_store()
+    rows = np.empty(len(texts), dtype=np.int64)
+    encoded = 0
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        keys = [content_key(t) for t in batch]
+        batch_rows = store.rows(keys)
+
+        # Deduplicate so identical chunk text is only encoded once
+        missing = {}
+        for key, text, row in zip(keys, batch, batch_rows):
+            if row < 0 and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = get_model().encode(list(missing.values()), convert_to_numpy=True)
+            store.append(list(missing), vectors)
+            batch_rows = store.rows(keys)
+            encoded += len(missing)
+            logger.info(f"Encoded {encoded} new texts ({start + len(batch)}/{len(texts)} processed)")
+        rows[start:start + len(batch)] = batch_rows
+
+    logger.info(f"Embedding store hit {len(texts) - encoded}/{len(texts)} — encoded {encoded} new texts")
+    return store.take(rows)
 
 
 def generate_single_embedding(text: str) -> list[float]:
@@ -0,0 +1,340 @@
+"""
+HemaV MedAssist — Persistent Embedding Store
+
+Content-addressed on-disk cache of chunk embeddings, so re-indexing into a
+new Endee configuration (precision, M, index name, fresh node) never has to
+re-run the embedding model for text it has already seen.
+
+Layout (one directory per embedding model):
+    meta.json             — model ID + dimension
+    store.lock            — flock target (shared: open/read, exclusive: append/compact/repair)
+    CURRENT               — name of the live generation directory
+    gen-NNNNNN/
+        vectors.f32       — row-major float32 matrix, read through numpy.memmap
+        keys.txt          — one key per line; line N ↔ row N of vectors.f32
+
+Key = sha256(model ID + NUL + chunk text), so identical text is embedded once
+no matter which file/page/index it ends up in.
+
+Appends go to the live generation (vectors first, then keys, each fsynced)
+under the exclusive lock, after catching up with rows other writers added.
+A crash mid-append leaves trailing vector bytes and/or a torn last key line;
+the next open sees that, takes the exclusive lock and truncates both, so a
+row is only ever served under the key written for it.
+
+Compaction writes a complete new generation, fsyncs it and then switches
+CURRENT with one atomic rename; a crash at any point leaves either the old
+or the new generation live, never a mix. Processes that still map an old
+generation keep reading it until they reopen.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from contextlib import contextmanager
+import numpy as np
+from config import EMBEDDING_MODEL, EMBEDDING_DIMENSION, EMBEDDING_STORE_DIR
+
+logger = logging.getLogger("hemav.embeddings.store")
+
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def content_key(text: str, model_id: str = EMBEDDING_MODEL) -> str:
+    """Content address for a chunk embedding."""
+    return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only float32 embedding store with a memory-mapped vector file."""
+
+    def __init__(self, root: str = EMBEDDING_STORE_DIR, model_id: str = EMBEDDING_MODEL,
+                 dimension: int = EMBEDDING_DIMENSION):
+        self.model_id = model_id
+        self.dimension = dimension
+        self.path = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", model_id))
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._lock_path = os.path.join(self.path, "store.lock")
+        self._current_path = os.path.join(self.path, "CURRENT")
+
+        self._generation = None
+        self._reset()
+
+        os.makedirs(self.path, exist_ok=True)
+        self._check_meta()
+        self._load()
+
+    # ── Setup ───────────────────────────────────────────────
+
+    def _check_meta(self):
+        meta = {"model_id": self.model_id, "dimension": self.dimension}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r") as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(f"Embedding store at {self.path} was built with {existing}, not {meta}")
+        else:
+            with open(self._meta_path, "w") as f:
+                json.dump(meta, f)
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the store-wide flock (shared for readers, exclusive for writers)."""
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _file(self, name: str, generation: str = None) -> str:
+        return os.path.join(self.path, generation or self._generation, name)
+
+    def _reset(self):
+        self._keys: list[str] = []
+        self._index: dict[str, int] = {}
+        self._keys_bytes = 0  # bytes of keys.txt already parsed
+        self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+
+    def _read_current(self) -> str | None:
+        try:
+            with open(self._current_path, "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_current(self, generation: str):
+        """Atomically point CURRENT at `generation`."""
+        tmp_path = self._current_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(generation + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._current_path)
+        _fsync_dir(self.path)
+
+    def _new_generation(self) -> str:
+        """Create an empty generation directory after the live one (caller holds the exclusive lock)."""
+        number = int(self._generation.split("-")[1]) + 1 if self._generation else 1
+        generation = f"gen-{number:06d}"
+        gen_dir = os.path.join(self.path, generation)
+        shutil.rmtree(gen_dir, ignore_errors=True)  # leftover of a crashed compaction
+        os.makedirs(gen_dir)
+        return generation
+
+    def _migrate_flat_layout(self):
+        """Move a store written before generations existed (files directly in self.path) into gen-000001."""
+        legacy = [n for n in ("vectors.f32", "keys.txt") if os.path.exists(os.path.join(self.path, n))]
+        if not legacy or self._read_current() is not None:
+            return
+        with self._locked(exclusive=True):
+            if self._read_current() is not None:
+                return
+            generation = self._new_generation()
+            for name in legacy:
+                os.replace(os.path.join(self.path, name), self._file(name, generation))
+            self._write_current(generation)
+            logger.info(f"Moved embedding store at {self.path} into {generation}")
+
+    def _load(self):
+        """(Re)build the key → row index and map the vector file, repairing a crashed append."""
+        self._migrate_flat_layout()
+        with self._locked(exclusive=False):
+            consistent = self._sync(repair=False)
+        if not consistent:
+            with self._locked(exclusive=True):
+                self._sync(repair=True)
+
+    def _sync(self, repair: bool) -> bool:
+        """
+        Catch up with the files on disk: reload after a generation switch,
+        otherwise parse only the keys appended since the last sync.
+
+        Returns False (without changing anything) if the files need repair and
+        `repair` is False; truncation requires the exclusive lock.
+        """
+        generation = self._read_current()
+        if generation != self._generation:
+            self._generation = generation
+            self._reset()
+        if generation is None:
+            return True
+
+        keys_path, vectors_path = self._file("keys.txt"), self._file("vectors.f32")
+        keys_size = os.path.getsize(keys_path) if os.path.exists(keys_path) else 0
+        if keys_size < self._keys_bytes:
+            raise ValueError(f"Embedding store at {self.path} is corrupt: keys.txt shrank underneath us")
+        tail = b""
+        if keys_size > self._keys_bytes:
+            with open(keys_path, "rb") as f:
+                f.seek(self._keys_bytes)
+                tail = f.read(keys_size - self._keys_bytes)
+
+        complete = tail.rfind(b"\n") + 1
+        new_keys = tail[:complete].decode("ascii", errors="replace").splitlines()
+        bad = next((i for i, key in enumerate(new_keys) if not _KEY_RE.fullmatch(key)), None)
+        if bad is not None:
+            raise ValueError(f"Embedding store at {self.path} is corrupt: "
+                             f"malformed key {new_keys[bad]!r} on line {len(self._keys) + bad + 1} of keys.txt")
+
+        row_bytes = self.dimension * 4
+        expected = (len(self._keys) + len(new_keys)) * row_bytes
+        actual = os.path.getsize(vectors_path) if os.path.exists(vectors_path) else 0
+        if actual < expected:
+            # Keys without vectors can only come from external tampering — refuse to guess
+            raise ValueError(f"Embedding store at {self.path} is corrupt: "
+                             f"{len(self._keys) + len(new_keys)} keys but only {actual // row_bytes} vectors")
+
+        torn = complete < len(tail)
+        if (torn or actual > expected) and not repair:
+            return False
+        if torn:
+            # Torn write: the last key never got its newline
+            logger.warning(f"Truncating partial key line {tail[complete:]!r} in {self.path}")
+            with open(keys_path, "r+b") as f:
+                f.truncate(self._keys_bytes + complete)
+        if actual > expected:
+            logger.warning(f"Truncating {actual - expected} bytes of unindexed vectors in {self.path}")
+            with open(vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+        if new_keys:
+            # Later duplicates win — compaction removes the dead rows
+            start = len(self._keys)
+            self._keys.extend(new_keys)
+            self._index.update((key, start + offset) for offset, key in enumerate(new_keys))
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r",
+                                      shape=(len(self._keys), self.dimension))
+        self._keys_bytes += complete
+        return True
+
+    # ── Reads ───────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only memory-mapped (rows, dimension) float32 matrix."""
+        return self._vectors
+
+    def rows(self, keys: list[str]) -> np.ndarray:
+        """Row numbers for keys; -1 where the key is not stored."""
+        return np.fromiter((self._index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+    def get_many(self, keys: list[str]) -> np.ndarray:
+        """
+        Fetch vectors for keys (all must be present).
+
+        When the rows are one contiguous ascending run — the usual case when
+        re-indexing the same corpus — this returns a zero-copy memmap slice.
+        Otherwise it gathers rows into a new array.
+        """
+        return self.take(self.rows(keys))
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Vectors at `rows` (see get_many); zero-copy for a contiguous ascending run."""
+        if len(rows) and rows.min() < 0:
+            raise KeyError(f"{int((rows < 0).sum())} keys not in embedding store")
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1 and np.all(np.diff(rows) == 1):
+            return self._vectors[rows[0]:rows[-1] + 1]
+        return self._vectors[rows]
+
+    # ── Writes ──────────────────────────────────────────────
+
+    def append(self, keys: list[str], vectors) -> None:
+        """
+        Append (key, vector) pairs and remap the vector file. Keys that are
+        already stored (possibly by another process since we last looked)
+        are skipped.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(keys), self.dimension):
+            raise ValueError(f"Expected vectors of shape ({len(keys)}, {self.dimension}), got {vectors.shape}")
+
+        with self._locked(exclusive=True):
+            self._sync(repair=True)
+            fresh = {}
+            for i, key in enumerate(keys):
+                if key not in self._index and key not in fresh:
+                    fresh[key] = i
+            if not fresh:
+                return
+            if self._generation is None:
+                generation = self._new_generation()
+                self._write_current(generation)
+                self._sync(repair=True)
+
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(vectors[list(fresh.values())].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._file("keys.txt"), "a") as f:
+                f.write("".join(f"{key}\n" for key in fresh))
+                f.flush()
+                os.fsync(f.fileno())
+            self._sync(repair=False)
+
+        logger.info(f"Appended {len(fresh)} embeddings to store ({len(self)} total)")
+
+    def compact(self, keep: set[str] = None) -> int:
+        """
+        Rewrite the store without duplicate rows and, if given, without keys
+        outside `keep`. Returns the number of rows removed.
+        """
+        with self._locked(exclusive=True):
+            self._sync(repair=True)
+            live = sorted(
+                (row, key) for key, row in self._index.items()
+                if keep is None or key in keep
+            )
+            removed = len(self._keys) - len(live)
+            if removed == 0:
+                return 0
+
+            old_generation = self._generation
+            generation = self._new_generation()
+            with open(self._file("vectors.f32", generation), "wb") as f:
+                for start in range(0, len(live), 4096):
+                    batch = [row for row, _ in live[start:start + 4096]]
+                    f.write(np.ascontiguousarray(self._vectors[batch]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._file("keys.txt", generation), "w") as f:
+                f.write("".join(f"{key}\n" for _, key in live))
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_dir(os.path.join(self.path, generation))
+
+            # The single atomic switch; everything before it is invisible to readers
+            self._write_current(generation)
+            self._sync(repair=False)
+            shutil.rmtree(os.path.join(self.path, old_generation), ignore_errors=True)
+
+        logger.info(f"Compacted embedding store: removed {removed} rows, {len(self)} remain")
+        return removed
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_store = None  # Lazy-loaded singleton
+
+
+def get_store() -> EmbeddingStore:
+    """Open the embedding store for the configured model (cached singleton)."""
+    global _store
+    if _store is None:
+        _store = EmbeddingStore()
+    return _store
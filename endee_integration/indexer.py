@@ -17,32 +17,37 @@ Why Cosine Similarity:
 - Industry standard for text embeddings (Sentence Transformers trained on cosine)
 - Range [0, 1] makes confidence scores interpretable
 """
+import json
 import logging
+import os
+from datetime import datetime
+import numpy as np
 from endee import Endee, Precision
-from config import ENDEE_HOST, ENDEE_AUTH_TOKEN, INDEX_NAME, EMBEDDING_DIMENSION
+from config import ENDEE_HOST, ENDEE_AUTH_TOKEN, INDEX_NAME, EMBEDDING_DIMENSION, EMBEDDING_MODEL, INDEX_VERSION_PATH
+from endee_integration.sharding import get_shards, partition
 
 logger = logging.getLogger("hemav.endee.indexer")
 
 
-def get_client() -> Endee:
+def get_client(host: str = ENDEE_HOST) -> Endee:
     """Initialize the Endee client."""
     if ENDEE_AUTH_TOKEN:
         client = Endee(ENDEE_AUTH_TOKEN)
     else:
         client = Endee()
-    client.set_base_url(f"{ENDEE_HOST}/api/v1")
+    client.set_base_url(f"{host}/api/v1")
     return client
 
 
-def create_index(client: Endee = None):
+def create_index(client: Endee = None, index_name: str = INDEX_NAME):
     """Create the medical docs index in Endee if it doesn't exist."""
     if client is None:
         client = get_client()
 
     try:
         # Try to get the index. If it exists, this succeeds.
-        client.get_index(name=INDEX_NAME)
-        logger.info(f"Index '{INDEX_NAME}' already exists — skipping creation")
+        client.get_index(name=index_name)
+        logger.info(f"Index '{index_name}' already exists — skipping creation")
         return
     except Exception:
         # If it doesn't exist, we create it
@@ -50,20 +55,36 @@ def create_index(client: Endee = None):
 
     try:
         client.create_index(
-            name=INDEX_NAME,
+            name=index_name,
             dimension=EMBEDDING_DIMENSION,
             space_type="cosine",           # Cosine similarity for semantic matching
             precision=Precision.FLOAT16,   # 16-bit precision: good accuracy, half the memory
         )
-        logger.info(f"Created Endee index '{INDEX_NAME}' (dim={EMBEDDING_DIMENSION}, cosine, FLOAT16)")
+        logger.info(f"Created Endee index '{index_name}' (dim={EMBEDDING_DIMENSION}, cosine, FLOAT16)")
     except Exception as e:
         if "already exists" in str(e).lower() or "Conflict" in str(e):
-            logger.info(f"Index '{INDEX_NAME}' already exists — skipping creation")
+            logger.info(f"Index '{index_name}' already exists — skipping creation")
         else:
             raise
 
 
-def upsert_vectors(chunks: list[dict], embeddings: list[list[float]], batch_size: int = 50):
+def create_shard_indexes():
+    """Create the index of every configured shard (just INDEX_NAME when unsharded)."""
+    for shard in get_shards():
+        create_index(get_client(shard.host), shard.index_name)
+
+
+def filter_columns(chunks) -> dict[str, np.ndarray]:
+    """
+    Filter fields stored with each chunk, one array per field (row i ↔ chunk i).
+    Shared with the local search backend, which keeps them as columns.
+    """
+    return {
+        "doc_type": np.full(len(chunks), "medical"),
+    }
+
+
+def upsert_vectors(chunks, embeddings, batch_size: int = 50):
     """
     Batch upsert embedded chunks into Endee with metadata for source attribution.
 
@@ -72,17 +93,40 @@ def upsert_vectors(chunks: list[dict], embeddings: list[list[float]], batch_size
     - meta.source: originating document filename
     - meta.page: page number in the PDF
     - filter.doc_type: "medical" (for filtered queries)
+
+    `chunks` may be a list of dicts or a data.chunk_table.ChunkTable (rows are
+    read through lazy views). `embeddings` may be a list of lists or a
+    (possibly memory-mapped) numpy array. Only one batch of rows is ever
+    materialized as Python objects.
+
+    With NUM_SHARDS > 1, each chunk goes to the shard chosen by SHARD_KEY.
     """
-    client = get_client()
-    index = client.get_index(name=INDEX_NAME)
+    filters = filter_columns(chunks)
+    shards = get_shards()
+    if len(shards) == 1:
+        _upsert_shard(shards[0], chunks, embeddings, filters, np.arange(len(chunks)), batch_size)
+        return
+
+    for shard, rows in zip(shards, partition(chunks, len(shards))):
+        if len(rows):
+            _upsert_shard(shard, chunks, embeddings, filters, rows, batch_size)
 
-    total = len(chunks)
+
+def _upsert_shard(shard, chunks, embeddings, filters: dict[str, np.ndarray], rows: np.ndarray, batch_size: int):
+    client = get_client(shard.host)
+    index = client.get_index(name=shard.index_name)
+
+    total = len(rows)
     for i in range(0, total, batch_size):
-        batch_chunks = chunks[i:i + batch_size]
-        batch_embeddings = embeddings[i:i + batch_size]
+        batch_rows = rows[i:i + batch_size]
+        if isinstance(embeddings, np.ndarray):
+            batch_embeddings = embeddings[batch_rows].tolist()
+        else:
+            batch_embeddings = [e.tolist() if hasattr(e, "tolist") else e for e in (embeddings[r] for r in batch_rows)]
 
         vectors = []
-        for chunk, embedding in zip(batch_chunks, batch_embeddings):
+        for row, embedding in zip(batch_rows, batch_embeddings):
+            chunk = chunks[row]
             vectors.append({
                 "id": chunk["id"],
                 "vector": embedding,
@@ -91,9 +135,7 @@ def upsert_vectors(chunks: list[dict], embeddings: list[list[float]], batch_size
                     "source": chunk["source"],
                     "page": chunk["page"],
                 },
-                "filter": {
-                    "doc_type": "medical",
-                },
+                "filter": {field: column[row].item() for field, column in filters.items()},
             })
 
         index.upsert(vectors)
@@ -101,4 +143,46 @@ def upsert_vectors(chunks: list[dict], embeddings: list[list[float]], batch_size
         total_batches = (total + batch_size - 1) // batch_size
         logger.info(f"Upserted batch {batch_num}/{total_batches} ({len(vectors)} vectors)")
 
-    logger.info(f"Successfully upserted {total} vectors into '{INDEX_NAME}'")
+    logger.info(f"Successfully upserted {total} vectors into '{shard.index_name}' on {shard.host}")
+
+
+def write_index_version(version: str = None, corpus: list[dict] = None, fingerprint: str = None,
+                        num_vectors: int = None) -> str:
+    """
+    Record that the index contents changed (ingestion, snapshot restore).
+    Anything derived from the index — e.g. precomputed answers — is bound to
+    this version and ignored once it changes.
+
+    `corpus` / `fingerprint` describe the source files the index was built
+    from (see endee_integration.snapshots), so a snapshot published later is
+    labelled with what is actually in the index, not with what is on disk.
+    """
+    version = version or datetime.now().strftime("%Y%m%d%H%M%S%f")
+    record = {
+        "index_name": INDEX_NAME,
+        "embedding_model": EMBEDDING_MODEL,
+        "version": version,
+        "fingerprint": fingerprint,
+        "corpus": corpus,
+        "num_vectors": num_vectors,
+    }
+    tmp_path = INDEX_VERSION_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, INDEX_VERSION_PATH)  # the server may be reading it
+    logger.info(f"Index version is now '{version}'")
+    return version
+
+
+def read_index_record() -> dict | None:
+    """The full record written by write_index_version, or None if never recorded."""
+    if not os.path.exists(INDEX_VERSION_PATH):
+        return None
+    with open(INDEX_VERSION_PATH, "r") as f:
+        return json.load(f)
+
+
+def read_index_version() -> str | None:
+    """Current index version, or None if it was never recorded."""
+    record = read_index_record()
+    return record.get("version") if record else None
@@ -0,0 +1,247 @@
+"""
+HemaV MedAssist — Local (In-Process) Vector Search
+
+Exact cosine top-k over an in-memory NumPy matrix of the indexed chunks.
+
+Why an in-process backend next to Endee:
+- The corpus is small (~1.5K chunks × 384 dims ≈ 2.3 MB as float32)
+- One vectorized matmul over that matrix is cheaper than an HTTP round trip
+- It keeps retrieval working while Endee is down or under maintenance
+
+LOCAL_INDEX_PRECISION=float16 halves the file on disk only: NumPy has no
+BLAS path for float16 matmuls (~40x slower), so vectors are always searched
+as float32 in memory.
+
+The local index is written at ingestion time next to the Endee upsert, from
+the same chunk table, embeddings and filter columns, so both backends return
+the same ids, metadata and cosine similarities.
+
+Layout in LOCAL_INDEX_DIR:
+    vectors.npy   — (N, dim) L2-normalized matrix in LOCAL_INDEX_PRECISION
+    chunks.npz    — the indexed rows as a data.chunk_table.ChunkTable
+    filters.npz   — one array per filter field (row i ↔ chunk i)
+    index.json    — index name, embedding model, dimension and index version
+                    (written last, so it marks a complete save)
+
+The local index is bound to the index version (INDEX_VERSION_PATH) it was
+written for: get_local_index() reloads when either changes on disk and
+refuses to serve an index built for another version, so the fallback never
+answers from a different corpus than Endee holds. Snapshots carry a copy of
+it (endee_integration/snapshots.py).
+
+Everything stays columnar, so memory scales with the corpus bytes rather
+than with one Python object per chunk.
+"""
+import json
+import logging
+import os
+import numpy as np
+from config import (
+    INDEX_NAME, EMBEDDING_MODEL, EMBEDDING_DIMENSION, INDEX_VERSION_PATH, LOCAL_INDEX_DIR, LOCAL_INDEX_PRECISION,
+)
+from data.chunk_table import ChunkTable
+from endee_integration.indexer import read_index_version
+
+logger = logging.getLogger("hemav.endee.local_search")
+
+_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalIndex:
+    """Exact cosine-similarity index held as one contiguous matrix."""
+
+    def __init__(self, vectors: np.ndarray, chunks: ChunkTable, filters: dict[str, np.ndarray],
+                 precision: str = LOCAL_INDEX_PRECISION, index_version: str = None):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)  # BLAS-backed search
+        self.chunks = chunks
+        self.filters = filters
+        self.precision = precision  # on-disk dtype
+        self.index_version = index_version
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    # ── Persistence ─────────────────────────────────────────
+
+    @classmethod
+    def build(cls, chunks: ChunkTable, embeddings, filters: dict[str, np.ndarray],
+              precision: str = LOCAL_INDEX_PRECISION) -> "LocalIndex":
+        """Build from ingestion output (chunk table + embeddings + filter columns)."""
+        # Round through the on-disk dtype so a fresh build scores exactly like a reload
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32)).astype(_DTYPES[precision])
+        return cls(vectors, chunks, filters, precision=precision)
+
+    def save(self, path: str = LOCAL_INDEX_DIR):
+        """Write all files; index.json goes last and marks the save complete."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors.astype(_DTYPES[self.precision]))
+        self.chunks.save(os.path.join(path, "chunks.npz"))
+        with open(os.path.join(path, "filters.npz"), "wb") as f:
+            np.savez(f, **self.filters)
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({
+                "index_name": INDEX_NAME,
+                "embedding_model": EMBEDDING_MODEL,
+                "embedding_dimension": EMBEDDING_DIMENSION,
+                "index_version": self.index_version,
+            }, f)
+        logger.info(f"Saved local index ({len(self)} vectors, {self.precision}, "
+                    f"version {self.index_version}) to {path}")
+
+    @classmethod
+    def load(cls, path: str = LOCAL_INDEX_DIR, index_version: str = "any") -> "LocalIndex":
+        """
+        Load from `path`. Unless index_version is "any", refuse an index
+        written for a different index version.
+        """
+        with open(os.path.join(path, "index.json"), "r") as f:
+            meta = json.load(f)
+        if meta["embedding_model"] != EMBEDDING_MODEL or meta["index_name"] != INDEX_NAME:
+            raise ValueError(
+                f"Local index at {path} was built for {meta['index_name']}/{meta['embedding_model']}, "
+                f"not {INDEX_NAME}/{EMBEDDING_MODEL}"
+            )
+        if index_version != "any" and meta.get("index_version") != index_version:
+            raise ValueError(f"Local index at {path} is for index version {meta.get('index_version')!r}, "
+                             f"Endee holds {index_version!r}")
+        vectors = np.load(os.path.join(path, "vectors.npy"))
+        chunks = ChunkTable.load(os.path.join(path, "chunks.npz"))
+        with np.load(os.path.join(path, "filters.npz")) as data:
+            filters = {field: data[field] for field in data.files}
+        if len(vectors) != len(chunks) or any(len(column) != len(chunks) for column in filters.values()):
+            raise ValueError(f"Local index at {path} is incomplete (save in progress?)")
+        logger.info(f"Loaded local index ({len(chunks)} vectors, {vectors.dtype}) from {path}")
+        return cls(vectors, chunks, filters, precision=vectors.dtype.name, index_version=meta.get("index_version"))
+
+    # ── Search ──────────────────────────────────────────────
+
+    def _filter_mask(self, filter: list[dict]) -> np.ndarray:
+        """
+        Evaluate an Endee-style filter ([{"field": {"$op": value}}], AND-ed)
+        against the stored filter columns. Supports $eq, $in and $range;
+        unknown fields match nothing.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for condition in filter:
+            for field, expr in condition.items():
+                if not isinstance(expr, dict) or len(expr) != 1:
+                    raise ValueError("Operator must be a single-field object")
+                op, value = next(iter(expr.items()))
+                if op not in ("$eq", "$in", "$range"):
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                column = self.filters.get(field)
+                if column is None:
+                    mask[:] = False
+                elif op == "$eq":
+                    mask &= column == value
+                elif op == "$in":
+                    mask &= np.isin(column, list(value))
+                elif column.dtype.kind in "iuf":
+                    low, high = value
+                    mask &= (column >= low) & (column <= high)
+                else:
+                    mask[:] = False  # $range on a non-numeric field
+        return mask
+
+    def query(self, vector, top_k: int, filter: list[dict] = None) -> list[dict]:
+        """
+        Exact top-k by cosine similarity.
+
+        Returns:
+            Endee-shaped results: dicts with id, similarity, meta {text, source, page}
+        """
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")  # Endee rejects k < 1 too
+        if len(self) == 0:
+            return []
+
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        scores = self.vectors @ query
+
+        if filter:
+            scores[~self._filter_mask(filter)] = -np.inf
+
+        k = min(top_k, len(scores))
+        # argpartition is O(N); only the k winners get fully sorted
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+
+        return [
+            {
+                "id": self.chunks.chunk_id(i),
+                "similarity": float(scores[i]),
+                "meta": {
+                    "text": self.chunks.text(i),
+                    "source": self.chunks.sources[self.chunks.source_ids[i]],
+                    "page": int(self.chunks.pages[i]),
+                },
+            }
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+
+_index = None  # Lazy-loaded singleton
+_stamp = None  # (index.json mtime, index version file mtime) _index was loaded at
+
+
+def get_local_index() -> LocalIndex:
+    """
+    The local index for the current index version (cached; reloaded when
+    LOCAL_INDEX_DIR or the index version changes on disk). Raises if the
+    saved index belongs to another version.
+    """
+    global _index, _stamp
+    stamp = (_mtime(os.path.join(LOCAL_INDEX_DIR, "index.json")), _mtime(INDEX_VERSION_PATH))
+    if _index is None or stamp != _stamp:
+        _index, _stamp = None, stamp
+        _index = LocalIndex.load(index_version=read_index_version())
+    return _index
+
+
+def save_local_index(chunks: ChunkTable, embeddings, filters: dict[str, np.ndarray], index_version: str = None):
+    """
+    Merge an ingestion run into the local index, labelled with the index
+    version it now matches, and replace the cached one. Like an Endee
+    upsert, rows with the same id are overwritten and other existing rows
+    are kept.
+    """
+    global _index, _stamp
+    new = LocalIndex.build(chunks, embeddings, filters)
+    new.index_version = index_version
+
+    try:
+        old = LocalIndex.load()
+    except (OSError, ValueError, KeyError):
+        old = None
+    if old is not None and set(old.filters) != set(new.filters):
+        logger.warning(f"Filter fields changed ({sorted(old.filters)} → {sorted(new.filters)}) — "
+                       f"rebuilding the local index from this run only")
+        old = None
+
+    if old is not None and len(old):
+        sources = new.chunks.sources
+        keep = np.flatnonzero(~np.isin(old.chunks.id_keys(sources), new.chunks.id_keys(sources)))
+        new = LocalIndex(
+            np.concatenate([old.vectors[keep], new.vectors]),
+            ChunkTable.concat([old.chunks.take(keep), new.chunks]),
+            {field: np.concatenate([old.filters[field][keep], column]) for field, column in new.filters.items()},
+            precision=new.precision,
+            index_version=index_version,
+        )
+
+    new.save()
+    _index, _stamp = new, None  # re-stat on next use
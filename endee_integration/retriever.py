@@ -4,40 +4,92 @@ HemaV MedAssist — Endee Vector DB: Retriever
 Handles semantic search against Endee for the RAG pipeline.
 Converts user queries to embeddings, searches for top-k similar
 chunks, and builds context with confidence scores and source attribution.
+
+The search backend is chosen by RETRIEVAL_BACKEND:
+- "endee": always query the Endee server
+- "local": exact in-process search (endee_integration/local_search.py)
+- "auto":  query Endee, fall back to local search on connection errors;
+           after a connection error, queries skip Endee for ENDEE_RETRY_AFTER
+           seconds (circuit breaker) instead of each paying the connect timeout
 """
 import json
 import logging
 import os
+import time
 from datetime import datetime
-from config import INDEX_NAME, TOP_K, LOGS_DIR
+from config import TOP_K, LOGS_DIR, RETRIEVAL_BACKEND, ENDEE_RETRY_AFTER
 from embeddings.generator import generate_single_embedding
-from endee_integration.indexer import get_client
+from endee_integration.local_search import get_local_index
+from endee_integration.sharding import scatter_gather, search_shard
 
 logger = logging.getLogger("hemav.endee.retriever")
 
+_endee_down_until = 0.0  # "auto" circuit breaker: monotonic time to try Endee again
+
+
+def _is_connection_error(e: Exception) -> bool:
+    """True for network-level failures (server down/unreachable), not query errors."""
+    return any(
+        "ConnectionError" in cls.__name__ or "Timeout" in cls.__name__
+        for cls in type(e).__mro__
+    )
+
+
+def _query_endee(query_embedding: list[float], top_k: int, filter: list[dict] = None) -> list[dict]:
+    """Query every Endee shard (just INDEX_NAME when unsharded) and merge the top-k."""
+    return scatter_gather(lambda shard: search_shard(shard, query_embedding, top_k, filter=filter), top_k)
+
 
-def retrieve(query: str, top_k: int = TOP_K) -> list[dict]:
+def _query_local(query_embedding: list[float], top_k: int, filter: list[dict] = None) -> list[dict]:
+    return get_local_index().query(query_embedding, top_k=top_k, filter=filter)
+
+
+def retrieve(query: str, top_k: int = TOP_K, filter: list[dict] = None,
+             query_embedding: list[float] = None, log: bool = True) -> list[dict]:
     """
     Semantic search pipeline:
     1. Convert query → embedding
-    2. Query Endee for top-k similar chunks (cosine similarity)
+    2. Query Endee (or the local index) for top-k similar chunks (cosine similarity)
     3. Return results with confidence scores and source metadata
 
+    Args:
+        filter: optional Endee filter, e.g. [{"doc_type": {"$eq": "medical"}}]
+        query_embedding: precomputed query embedding (skips step 1)
+        log: append the query to the retrieval log (off for offline jobs)
+
     Returns:
         List of dicts with: id, text, source, page, similarity (confidence score)
     """
     # Step 1: Generate query embedding
-    query_embedding = generate_single_embedding(query)
-
-    # Step 2: Query Endee
-    client = get_client()
-    index = client.get_index(name=INDEX_NAME)
-
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        ef=128,  # HNSW exploration factor — higher = more accurate but slower
-    )
+    if query_embedding is None:
+        query_embedding = generate_single_embedding(query)
+
+    # Step 2: Query the configured backend
+    global _endee_down_until
+    results = None
+    if RETRIEVAL_BACKEND == "local":
+        results = _query_local(query_embedding, top_k, filter)
+    elif RETRIEVAL_BACKEND == "auto" and time.monotonic() < _endee_down_until:
+        try:
+            results = _query_local(query_embedding, top_k, filter)
+        except Exception as local_error:
+            logger.error(f"Local search fallback unavailable: {local_error}")  # try Endee after all
+    if results is None:
+        try:
+            results = _query_endee(query_embedding, top_k, filter)
+            _endee_down_until = 0.0
+        except Exception as e:
+            if RETRIEVAL_BACKEND != "auto" or not _is_connection_error(e):
+                raise
+            if not _endee_down_until:
+                logger.warning(f"Endee unreachable ({type(e).__name__}) — using the local index "
+                               f"for {ENDEE_RETRY_AFTER:g}s")
+            _endee_down_until = time.monotonic() + ENDEE_RETRY_AFTER
+            try:
+                results = _query_local(query_embedding, top_k, filter)
+            except Exception as local_error:
+                logger.error(f"Local search fallback unavailable: {local_error}")
+                raise e
 
     # Step 3: Format results with confidence scores
     retrieved = []
@@ -52,7 +104,8 @@ def retrieve(query: str, top_k: int = TOP_K) -> list[dict]:
         })
 
     # Log retrieval results for debugging and evaluation
-    _log_retrieval(query, retrieved)
+    if log:
+        log_retrieval(query, retrieved)
 
     return retrieved
 
@@ -75,10 +128,11 @@ def build_context(results: list[dict]) -> str:
     return "\n\n---\n\n".join(context_parts)
 
 
-def _log_retrieval(query: str, results: list[dict]):
+def log_retrieval(query: str, results: list[dict], cached: bool = False):
     """
     Log retrieval results to a JSON file for evaluation and debugging.
     Shows which chunks were retrieved, their confidence scores, and sources.
+    `cached` marks queries answered from the precomputed answer cache.
     """
     try:
         os.makedirs(LOGS_DIR, exist_ok=True)
@@ -88,6 +142,7 @@ def _log_retrieval(query: str, results: list[dict]):
             "timestamp": datetime.now().isoformat(),
             "query": query,
             "num_results": len(results),
+            "cached": cached,
             "results": [
                 {
                     "id": r["id"],
@@ -0,0 +1,208 @@
+"""
+HemaV MedAssist — Endee Vector DB: Sharding
+
+Partitions the corpus across several Endee indexes (optionally on several
+hosts) and scatter-gathers queries across them.
+
+Why shard:
+- One Endee node keeps its whole HNSW graph in memory — that caps the corpus
+- N shards = N smaller graphs, searched in parallel, merged by similarity
+- Cosine similarities are comparable across shards (same model, same space),
+  so a global top-k is just the top-k of the per-shard top-k lists
+
+Layout:
+- NUM_SHARDS == 1 → the single index INDEX_NAME on ENDEE_HOST (unchanged)
+- NUM_SHARDS  > 1 → indexes "<INDEX_NAME>_s<i>", shard i placed on
+  ENDEE_SHARD_HOSTS[i % len(hosts)] (ENDEE_HOST when no hosts are listed)
+- SHARD_KEY "hash" spreads chunks by chunk id; "source" keeps each source
+  document on one shard
+"""
+import hashlib
+import json
+import logging
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+import msgpack
+import numpy as np
+import requests
+from config import (
+    ENDEE_HOST, ENDEE_AUTH_TOKEN, INDEX_NAME, NUM_SHARDS, ENDEE_SHARD_HOSTS, SHARD_KEY, SHARD_TIMEOUT,
+)
+
+logger = logging.getLogger("hemav.endee.sharding")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One partition of the corpus: an index on an Endee host."""
+    number: int
+    host: str
+    index_name: str
+
+
+def get_shards() -> list[Shard]:
+    """All configured shards, in shard-number order."""
+    if NUM_SHARDS <= 1:
+        return [Shard(0, ENDEE_HOST, INDEX_NAME)]
+    hosts = ENDEE_SHARD_HOSTS or [ENDEE_HOST]
+    return [Shard(i, hosts[i % len(hosts)], f"{INDEX_NAME}_s{i}") for i in range(NUM_SHARDS)]
+
+
+def shard_number(chunk: dict, num_shards: int = NUM_SHARDS) -> int:
+    """Stable shard assignment (md5, not hash(), so it survives restarts)."""
+    if num_shards <= 1:
+        return 0
+    key = chunk["source"] if SHARD_KEY == "source" else chunk["id"]
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big") % num_shards
+
+
+def partition(chunks, num_shards: int = NUM_SHARDS) -> list[np.ndarray]:
+    """Row positions of `chunks` belonging to each shard (one int64 array per shard)."""
+    assignment = np.fromiter((shard_number(chunk, num_shards) for chunk in chunks), dtype=np.int64, count=len(chunks))
+    return [np.flatnonzero(assignment == i) for i in range(max(num_shards, 1))]
+
+
+# ── Scatter-gather ──────────────────────────────────────────
+
+# Shared pool: one in-flight search per shard per concurrent request
+_executor = ThreadPoolExecutor(max_workers=max(4 * NUM_SHARDS, 4), thread_name_prefix="endee-shard")
+
+# The Endee SDK sets no HTTP timeout and retries connects with backoff, so a
+# hung shard would pin a pool thread per query. Shard searches therefore go
+# over this session with an explicit timeout and no retries.
+_session = requests.Session()
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=max(4 * NUM_SHARDS, 4), max_retries=0))
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(4 * NUM_SHARDS, 4), max_retries=0))
+
+
+def search_shard(shard: Shard, vector: list[float], top_k: int, ef: int = 128,
+                 filter: list[dict] = None, timeout: float = SHARD_TIMEOUT) -> list[dict]:
+    """
+    One shard's top-k via Endee's /index/<name>/search (same request and
+    result shape as the SDK's Index.query), bounded by `timeout` seconds.
+    """
+    vec = np.asarray(vector, dtype=np.float32)
+    data = {
+        "k": top_k,
+        "ef": ef,  # HNSW exploration factor — higher = more accurate but slower
+        "include_vectors": False,
+        "vector": (vec / max(float(np.linalg.norm(vec)), 1e-10)).tolist(),  # cosine space
+    }
+    if filter:
+        data["filter"] = json.dumps(filter)
+
+    headers = {"Authorization": ENDEE_AUTH_TOKEN} if ENDEE_AUTH_TOKEN else {}
+    resp = _session.post(f"{shard.host}/api/v1/index/{shard.index_name}/search",
+                         json=data, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+
+    results = []
+    for similarity, vec_id, meta, filter_str, norm, *_ in msgpack.unpackb(resp.content, raw=False)[:top_k]:
+        result = {
+            "id": vec_id,
+            "similarity": similarity,
+            "distance": 1.0 - similarity,
+            "meta": json.loads(zlib.decompress(meta)) if meta else {},
+            "norm": norm,
+        }
+        if filter_str:
+            result["filter"] = json.loads(filter_str)
+        results.append(result)
+    return results
+
+
+def scatter_gather(search, top_k: int, shards: list[Shard] = None, timeout: float = SHARD_TIMEOUT) -> list[dict]:
+    """
+    Run `search(shard)` on every shard in parallel and merge the results.
+
+    Shards that fail or run longer than `timeout` seconds (counted from when
+    their search starts, not while it waits for a pool thread) are skipped
+    (logged), so a slow or missing shard degrades recall instead of failing
+    the query. Raises only when no shard answered.
+
+    `search` must bound its own I/O (see search_shard): an abandoned search
+    still occupies its pool thread until it returns.
+    """
+    shards = shards or get_shards()
+    if len(shards) == 1:
+        return list(search(shards[0]))[:top_k]
+
+    started = {}
+
+    def run(shard: Shard):
+        started[shard] = time.monotonic()
+        return search(shard)
+
+    futures = {_executor.submit(run, shard): shard for shard in shards}
+    pending, done, timed_out = set(futures), set(), []
+    while pending:
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        finished, pending = wait(pending, timeout=max(0.0, min(deadlines) - now) if deadlines else timeout,
+                                 return_when=FIRST_COMPLETED)
+        done |= finished
+        now = time.monotonic()
+        for future in list(pending):
+            shard = futures[future]
+            if shard in started and now - started[shard] >= timeout:
+                pending.discard(future)
+                timed_out.append(shard)
+
+    merged, errors = [], []
+    for future in done:
+        shard = futures[future]
+        try:
+            merged.extend(future.result())
+        except Exception as e:
+            errors.append(e)
+            logger.warning(f"Shard {shard.number} ({shard.host}/{shard.index_name}) failed: {e}")
+    for shard in timed_out:
+        logger.warning(f"Shard {shard.number} ({shard.host}/{shard.index_name}) timed out after {timeout}s")
+
+    answered = len(done) - len(errors)
+    if answered == 0:
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"No Endee shard answered within {timeout}s")
+    if answered < len(shards):
+        logger.warning(f"Partial results: {answered}/{len(shards)} shards answered")
+
+    merged.sort(key=lambda item: item.get("similarity", 0.0), reverse=True)
+    return merged[:top_k]
+
+
+# ── Health / stats ──────────────────────────────────────────
+
+def shard_stats(shard: Shard, timeout: float = 5.0) -> dict:
+    """Health + index stats for one shard (from Endee's /index/<name>/info)."""
+    headers = {"Authorization": ENDEE_AUTH_TOKEN} if ENDEE_AUTH_TOKEN else {}
+    stats = {"shard": shard.number, "host": shard.host, "index": shard.index_name}
+    try:
+        resp = requests.get(f"{shard.host}/api/v1/index/{shard.index_name}/info", headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        return {**stats, "status": "unreachable", "error": str(e)}
+
+    if resp.status_code == 404:
+        return {**stats, "status": "missing"}
+    if resp.status_code >= 400:
+        return {**stats, "status": "error", "error": resp.text.strip()}
+
+    info = resp.json()
+    return {
+        **stats,
+        "status": "healthy",
+        "total_elements": info.get("total_elements"),
+        "dimension": info.get("dimension"),
+        "precision": info.get("precision"),
+    }
+
+
+# Separate pool so health checks against a dead host never starve searches
+_stats_executor = ThreadPoolExecutor(max_workers=max(NUM_SHARDS, 1), thread_name_prefix="endee-stats")
+
+
+def all_shard_stats() -> list[dict]:
+    """Stats for every shard, fetched in parallel."""
+    return list(_stats_executor.map(shard_stats, get_shards()))
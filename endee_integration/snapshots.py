@@ -0,0 +1,327 @@
+"""
+HemaV MedAssist — Endee Vector DB: Index Snapshots
+
+Publishes versioned backups of the Endee index together with a manifest
+describing the corpus and embedding model they were built from, and restores
+the latest matching snapshot on a fresh node.
+
+Why snapshots instead of re-ingesting:
+- Ingestion re-parses every PDF and re-embeds the whole corpus (CPU-heavy, minutes)
+- Restoring a backup is a file copy + archive extraction on the Endee server
+- The manifest fingerprint guarantees we never restore vectors built from a
+  different corpus, chunking config, or embedding model
+- The fingerprint is the one recorded when the index was built (ingestion or
+  restore, in INDEX_VERSION_PATH), and publishing is refused if the corpus on
+  disk has changed since — so stale vectors are never published as current
+
+Snapshots cover the single-index layout only (NUM_SHARDS == 1).
+
+Snapshot layout in SNAPSHOT_DIR:
+    <backup_name>.tar.gz   — archive downloaded from Endee (/backups/<name>/download)
+    <backup_name>.local/   — the matching local search index (RETRIEVAL_BACKEND
+                             local/auto fallback), if one existed at publish time
+    <backup_name>.json     — manifest (corpus files, model, chunking, fingerprint)
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+import requests
+from config import (
+    ENDEE_HOST, ENDEE_AUTH_TOKEN, INDEX_NAME, EMBEDDING_MODEL, EMBEDDING_DIMENSION,
+    CHUNK_SIZE, CHUNK_OVERLAP, DATA_DIR, MEDICAL_DOCS_DIR, SNAPSHOT_DIR, NUM_SHARDS, LOCAL_INDEX_DIR,
+)
+from endee_integration.indexer import read_index_record
+from endee_integration.local_search import LocalIndex
+
+logger = logging.getLogger("hemav.endee.snapshots")
+
+MANIFEST_VERSION = 1
+_REQUEST_TIMEOUT = 600  # Backup archives can be large — allow slow transfers
+
+
+def _api_url(path: str) -> str:
+    return f"{ENDEE_HOST}/api/v1{path}"
+
+
+def _headers() -> dict:
+    return {"Authorization": ENDEE_AUTH_TOKEN} if ENDEE_AUTH_TOKEN else {}
+
+
+def _raise_for_status(resp: requests.Response, action: str):
+    if resp.status_code >= 400:
+        raise RuntimeError(f"Endee {action} failed ({resp.status_code}): {resp.text.strip()}")
+
+
+# ── Corpus manifest ─────────────────────────────────────────
+
+def default_corpus_paths() -> list[str]:
+    """Directories ingested by default (mirrors main.run_ingestion)."""
+    return [DATA_DIR, MEDICAL_DOCS_DIR]
+
+
+def describe_corpus(paths: list[str]) -> list[dict]:
+    """
+    Describe the source files behind an ingestion run.
+
+    Directories are expanded to their .pdf/.txt files (same rules as
+    data.pdf_parser.extract_from_directory); missing paths are skipped.
+
+    Returns:
+        Sorted list of dicts with: source, bytes, sha256
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for fname in sorted(os.listdir(path)):
+                if fname.lower().endswith((".pdf", ".txt")):
+                    files.append(os.path.join(path, fname))
+        elif os.path.isfile(path):
+            files.append(path)
+
+    corpus = []
+    for fpath in files:
+        digest = hashlib.sha256()
+        with open(fpath, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        corpus.append({
+            "source": os.path.basename(fpath),
+            "bytes": os.path.getsize(fpath),
+            "sha256": digest.hexdigest(),
+        })
+
+    return sorted(corpus, key=lambda c: (c["source"], c["sha256"]))
+
+
+def corpus_fingerprint(corpus: list[dict]) -> str:
+    """
+    Hash everything that determines the vectors in the index:
+    corpus contents, chunking settings, and the embedding model.
+    """
+    payload = {
+        "corpus": corpus,
+        "index_name": INDEX_NAME,
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_dimension": EMBEDDING_DIMENSION,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ── Local snapshot catalogue ────────────────────────────────
+
+def list_snapshots(snapshot_dir: str = SNAPSHOT_DIR) -> list[dict]:
+    """Return all local snapshot manifests, newest first."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+
+    manifests = []
+    for fname in os.listdir(snapshot_dir):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(snapshot_dir, fname), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable manifest {fname}: {e}")
+            continue
+        archive = os.path.join(snapshot_dir, f"{manifest.get('backup_name', '')}.tar.gz")
+        if os.path.isfile(archive):
+            manifests.append(manifest)
+
+    return sorted(manifests, key=lambda m: m.get("created_at", ""), reverse=True)
+
+
+def find_latest_snapshot(paths: list[str] = None, snapshot_dir: str = SNAPSHOT_DIR) -> dict | None:
+    """Find the newest snapshot whose fingerprint matches the given corpus."""
+    fingerprint = corpus_fingerprint(describe_corpus(paths or default_corpus_paths()))
+    for manifest in list_snapshots(snapshot_dir):
+        if manifest.get("fingerprint") == fingerprint and manifest.get("index_name") == INDEX_NAME:
+            return manifest
+    return None
+
+
+# ── Publish / restore ───────────────────────────────────────
+
+def _delete_backup(backup_name: str):
+    """Remove a backup from the Endee server (best effort — logged, never raised)."""
+    try:
+        resp = requests.delete(_api_url(f"/backups/{backup_name}"), headers=_headers(), timeout=30)
+        _raise_for_status(resp, "backup delete")
+        logger.info(f"Deleted server-side backup '{backup_name}'")
+    except (requests.RequestException, RuntimeError) as e:
+        logger.warning(f"Could not delete server-side backup '{backup_name}': {e}")
+
+
+def publish_snapshot(paths: list[str] = None, num_vectors: int = None,
+                     snapshot_dir: str = SNAPSHOT_DIR) -> dict:
+    """
+    Back up the current Endee index and publish it to SNAPSHOT_DIR.
+
+    Steps:
+    1. Check that the corpus recorded for the index still matches `paths`
+    2. Ask Endee to create a named backup of INDEX_NAME
+    3. Download the backup archive
+    4. Copy the local search index, if it matches the same index version
+    5. Write the manifest (with the recorded corpus) next to it
+
+    Returns:
+        The written manifest dict
+    """
+    if NUM_SHARDS > 1:
+        raise RuntimeError("Index snapshots are not supported with NUM_SHARDS > 1")
+
+    record = read_index_record()
+    if not record or not record.get("fingerprint") or record.get("index_name") != INDEX_NAME:
+        raise RuntimeError("No corpus recorded for the current index — run ingestion (or restore a snapshot) first")
+    corpus, fingerprint = record["corpus"], record["fingerprint"]
+    if corpus_fingerprint(describe_corpus(paths or default_corpus_paths())) != fingerprint:
+        raise RuntimeError("The corpus on disk changed since the index was built — re-run ingestion before publishing")
+    if num_vectors is None:
+        num_vectors = record.get("num_vectors")
+
+    created_at = datetime.now()
+    # Endee backup names allow only [a-zA-Z0-9_-]
+    backup_name = f"{INDEX_NAME}-{created_at.strftime('%Y%m%d%H%M%S')}-{fingerprint[:12]}"
+
+    resp = requests.post(
+        _api_url(f"/index/{INDEX_NAME}/backup"),
+        json={"name": backup_name},
+        headers=_headers(),
+        timeout=_REQUEST_TIMEOUT,
+    )
+    _raise_for_status(resp, "backup")
+    logger.info(f"Created Endee backup '{backup_name}'")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    archive_path = os.path.join(snapshot_dir, f"{backup_name}.tar.gz")
+    tmp_path = archive_path + ".part"
+    try:
+        with requests.get(
+            _api_url(f"/backups/{backup_name}/download"),
+            headers=_headers(),
+            stream=True,
+            timeout=_REQUEST_TIMEOUT,
+        ) as resp:
+            _raise_for_status(resp, "backup download")
+            with open(tmp_path, "wb") as f:
+                for block in resp.iter_content(chunk_size=1 << 20):
+                    f.write(block)
+        os.replace(tmp_path, archive_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # The archive now lives in SNAPSHOT_DIR; don't keep a full index copy on the server
+        _delete_backup(backup_name)
+
+    try:
+        LocalIndex.load(LOCAL_INDEX_DIR, index_version=record.get("version")).save(
+            os.path.join(snapshot_dir, f"{backup_name}.local"))
+        has_local_index = True
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Publishing without a local search index: {e}")
+        has_local_index = False
+
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "backup_name": backup_name,
+        "index_name": INDEX_NAME,
+        "created_at": created_at.isoformat(),
+        "fingerprint": fingerprint,
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_dimension": EMBEDDING_DIMENSION,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "num_vectors": num_vectors,
+        "archive_bytes": os.path.getsize(archive_path),
+        "local_index": has_local_index,
+        "corpus": corpus,
+    }
+    # Manifest is written last so a half-published snapshot is never listed
+    with open(os.path.join(snapshot_dir, f"{backup_name}.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Published snapshot '{backup_name}' ({manifest['archive_bytes']} bytes)")
+    return manifest
+
+
+def restore_snapshot(manifest: dict, snapshot_dir: str = SNAPSHOT_DIR):
+    """
+    Restore a published snapshot into INDEX_NAME on the configured Endee host.
+    Uploads the archive first if this Endee node doesn't already have it.
+    """
+    backup_name = manifest["backup_name"]
+
+    resp = requests.get(_api_url("/backups"), headers=_headers(), timeout=30)
+    _raise_for_status(resp, "list backups")
+
+    if backup_name not in resp.json():
+        archive_path = os.path.join(snapshot_dir, f"{backup_name}.tar.gz")
+        with open(archive_path, "rb") as f:
+            resp = requests.post(
+                _api_url("/backups/upload"),
+                files={"backup": (f"{backup_name}.tar.gz", f, "application/gzip")},
+                headers=_headers(),
+                timeout=_REQUEST_TIMEOUT,
+            )
+        _raise_for_status(resp, "backup upload")
+        logger.info(f"Uploaded snapshot '{backup_name}' to Endee")
+
+    resp = requests.post(
+        _api_url(f"/backups/{backup_name}/restore"),
+        json={"target_index_name": manifest["index_name"]},
+        headers=_headers(),
+        timeout=_REQUEST_TIMEOUT,
+    )
+    _raise_for_status(resp, "backup restore")
+    logger.info(f"Restored snapshot '{backup_name}' into index '{manifest['index_name']}'")
+
+
+def restore_local_index(manifest: dict, index_version: str, snapshot_dir: str = SNAPSHOT_DIR) -> bool:
+    """
+    Install the snapshot's local search index into LOCAL_INDEX_DIR, labelled
+    with the index version the restore recorded. Returns False if the
+    snapshot has none (the stale local index is then refused by version).
+    """
+    path = os.path.join(snapshot_dir, f"{manifest['backup_name']}.local")
+    if not manifest.get("local_index") or not os.path.isdir(path):
+        logger.warning(f"Snapshot '{manifest['backup_name']}' has no local search index — "
+                       f"local fallback unavailable until the next ingestion")
+        return False
+    try:
+        index = LocalIndex.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Unreadable local search index in snapshot '{manifest['backup_name']}': {e}")
+        return False
+    index.index_version = index_version
+    index.save(LOCAL_INDEX_DIR)
+    return True
+
+
+def restore_latest_snapshot(paths: list[str] = None, snapshot_dir: str = SNAPSHOT_DIR) -> dict | None:
+    """
+    Restore the newest snapshot matching the current corpus + embedding model.
+
+    Returns:
+        The restored manifest, or None if no matching snapshot exists or
+        the restore failed (caller should fall back to ingestion).
+    """
+    if NUM_SHARDS > 1:
+        logger.info("Skipping snapshot restore — snapshots are not supported with NUM_SHARDS > 1")
+        return None
+
+    manifest = find_latest_snapshot(paths, snapshot_dir)
+    if manifest is None:
+        logger.info("No snapshot matches the current corpus and embedding model")
+        return None
+
+    try:
+        restore_snapshot(manifest, snapshot_dir)
+    except Exception as e:
+        logger.warning(f"Failed to restore snapshot '{manifest['backup_name']}': {e}")
+        return None
+
+    return manifest
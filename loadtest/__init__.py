@@ -0,0 +1,5 @@
+"""
+HemaV MedAssist — Load Testing
+Offline end-to-end load tests for /api/query against local Groq/Endee stand-ins.
+Run with: python -m loadtest --help
+"""
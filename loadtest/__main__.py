@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+HemaV MedAssist — Load-Test Harness
+
+Drives POST /api/query at stepped request rates against fully local
+stand-ins for Groq and Endee, and reports throughput, latency percentiles,
+error rates and the saturation point. Needs no network access or API quota.
+
+Usage:
+    python -m loadtest                              # in-process app, default steps
+    python -m loadtest --rps 2,5,10,20 --duration 30 --groq-429-rate 0.05
+    python -m loadtest --serve-fakes                # only run the fakes (prints env to point the app at them)
+    python -m loadtest --target http://127.0.0.1:5000   # drive an app you started yourself
+                                                    # (e.g. `uvicorn app.server:app --workers 4`)
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uvicorn
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_QUESTIONS = [
+    "What are the common symptoms of iron deficiency anemia?",
+    "What ferritin level indicates iron deficiency?",
+    "How is anemia classified by hemoglobin level in pregnant women?",
+    "What are the best dietary sources of heme iron?",
+    "How long should oral iron supplementation continue?",
+    "What is anemia of chronic disease?",
+]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a daemon thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = None):
+        self.host = host
+        self.port = port or _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "BackgroundServer":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def load_questions() -> list[str]:
+    """Logged user queries (if any) plus built-in samples."""
+    questions = list(SAMPLE_QUESTIONS)
+    log_file = os.path.join(BASE_DIR, "logs", "retrieval_log.jsonl")
+    if os.path.exists(log_file):
+        with open(log_file, "r") as f:
+            for line in f:
+                try:
+                    questions.append(json.loads(line)["query"])
+                except (ValueError, KeyError):
+                    continue
+    return questions
+
+
+def configure_environment(groq_url: str, endee_url: str, workdir: str):
+    """
+    Point the app at the fakes. Must run before `config` is imported;
+    python-dotenv never overrides variables that are already set.
+    """
+    os.environ.update({
+        "GROQ_BASE_URL": groq_url,
+        "GROQ_API_KEY": "loadtest",
+        "ENDEE_HOST": endee_url,
+        "ENDEE_AUTH_TOKEN": "",
+        "RETRIEVAL_BACKEND": "endee",
+        # Keep load-test artifacts out of the real logs / caches
+        "LOGS_DIR": os.path.join(workdir, "logs"),
+        "EMBEDDING_STORE_DIR": os.path.join(workdir, "embedding_store"),
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"),
+        "INDEX_VERSION_PATH": os.path.join(workdir, "index_version.json"),
+        "ANSWER_CACHE_PATH": os.path.join(workdir, "answer_cache.json"),
+    })
+
+
+def seed_endee(num_chunks: int):
+    """Create the index (or shards) on the fake Endee and fill it with synthetic chunks."""
+    from embeddings.generator import get_model
+    from endee_integration.indexer import create_shard_indexes, upsert_vectors
+
+    chunks = [
+        {
+            "id": f"loadtest_doc{i // 20}.pdf_p{i % 20 + 1}_c0",
+            "text": f"Synthetic medical passage {i} about hemoglobin, ferritin and iron deficiency anemia. " * 5,
+            "source": f"loadtest_doc{i // 20}.pdf",
+            "page": i % 20 + 1,
+        }
+        for i in range(num_chunks)
+    ]
+    embeddings = get_model().encode([c["text"] for c in chunks], convert_to_numpy=True)
+
+    create_shard_indexes()
+    upsert_vectors(chunks, embeddings, batch_size=500)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HemaV MedAssist — offline load test for /api/query")
+    parser.add_argument("--target", type=str, help="Base URL of an already running app (default: start one in-process)")
+    parser.add_argument("--serve-fakes", action="store_true", help="Only start the fake Groq/Endee servers and wait")
+    parser.add_argument("--rps", type=str, default="1,2,5,10,20", help="Comma-separated request-rate steps")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per step (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max in-flight client requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client request timeout in seconds")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p99 latency SLO used to flag saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error budget used to flag saturation")
+    parser.add_argument("--groq-latency-ms", type=float, default=300.0, help="Fake Groq time to first token")
+    parser.add_argument("--groq-tokens-per-sec", type=float, default=250.0, help="Fake Groq generation rate")
+    parser.add_argument("--groq-completion-tokens", type=int, default=400, help="Tokens per fake answer")
+    parser.add_argument("--groq-429-rate", type=float, default=0.0, help="Fraction of Groq calls rejected with 429")
+    parser.add_argument("--endee-latency-ms", type=float, default=5.0, help="Fake Endee per-request latency")
+    parser.add_argument("--seed-chunks", type=int, default=1547, help="Synthetic chunks indexed into fake Endee")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the real sentence-transformers model (needs it cached locally)")
+    parser.add_argument("--json", type=str, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    from loadtest.fakes import create_groq_app, create_endee_app, FakeEmbeddingModel
+    from loadtest.driver import run_step, format_report
+
+    workdir = tempfile.mkdtemp(prefix="hemav-loadtest-")
+    groq_app = create_groq_app(args.groq_latency_ms, args.groq_tokens_per_sec,
+                               args.groq_completion_tokens, args.groq_429_rate)
+    groq = BackgroundServer(groq_app).start()
+    endee = BackgroundServer(create_endee_app(args.endee_latency_ms)).start()
+    configure_environment(groq.url, endee.url, workdir)
+
+    # Imports below read config, so they must come after configure_environment()
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(BASE_DIR)  # app.server mounts static files by relative path
+    import embeddings.generator as generator
+    from config import EMBEDDING_DIMENSION
+
+    if not args.real_embeddings:
+        generator._model = FakeEmbeddingModel(EMBEDDING_DIMENSION)
+
+    print(f"🧪 Fake Groq on {groq.url}, fake Endee on {endee.url}")
+    print(f"🌱 Seeding fake Endee with {args.seed_chunks} synthetic chunks...")
+    seed_endee(args.seed_chunks)
+
+    if args.serve_fakes:
+        print("\nPoint the app at the fakes with:")
+        print(f"  GROQ_BASE_URL={groq.url} ENDEE_HOST={endee.url} RETRIEVAL_BACKEND=endee")
+        print("Press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return
+
+    app_server = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        from app.server import app
+        app_server = BackgroundServer(app).start()
+        base_url = app_server.url
+    url = f"{base_url}/api/query"
+
+    questions = load_questions()
+    steps = []
+    try:
+        run_step(url, questions, rps=1, duration=2, timeout=args.timeout)  # warm-up, not reported
+        for rps in [float(r) for r in args.rps.split(",") if r.strip()]:
+            print(f"🚦 {rps:g} rps for {args.duration:g}s...")
+            steps.append(run_step(url, questions, rps, args.duration, args.concurrency, args.timeout))
+    finally:
+        if app_server:
+            app_server.stop()
+        groq.stop()
+        endee.stop()
+
+    print()
+    print(format_report(steps, args.slo_ms, args.max_error_rate))
+    print(f"\nFake Groq: {groq_app.state.stats['requests']} calls, "
+          f"{groq_app.state.stats['rate_limited']} rejected with 429")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "steps": steps, "groq": groq_app.state.stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
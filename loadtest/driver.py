@@ -0,0 +1,123 @@
+"""
+HemaV MedAssist — Open-Loop Load Driver
+
+Fires POST /api/query at a fixed arrival rate, independent of how fast the
+server answers (open loop). Latency is measured from each request's
+*scheduled* send time, so client-side queueing under overload shows up in
+the percentiles instead of silently lowering the offered load.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# generate_answer() turns LLM failures into a 200 with this prefix
+LLM_ERROR_PREFIX = "❌ Error generating answer"
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def run_step(url: str, questions: list[str], rps: float, duration: float,
+             concurrency: int = 64, timeout: float = 30.0, api_key: str = "loadtest") -> dict:
+    """
+    Offer `rps` requests/second for `duration` seconds and wait for them to drain.
+
+    Returns:
+        dict with: target_rps, sent, ok, http_errors, llm_errors, transport_errors,
+        error_rate, throughput_rps, latency_ms {p50, p90, p99, max, mean}
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, outcomes = [], {"ok": 0, "http_errors": 0, "llm_errors": 0, "transport_errors": 0}
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def send(scheduled: float, question: str):
+        try:
+            resp = session().post(url, json={"question": question, "api_key": api_key}, timeout=timeout)
+            if resp.status_code != 200:
+                outcome = "http_errors"
+            elif resp.json().get("answer_raw", "").startswith(LLM_ERROR_PREFIX):
+                outcome = "llm_errors"
+            else:
+                outcome = "ok"
+        except requests.RequestException:
+            outcome = "transport_errors"
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            outcomes[outcome] += 1
+            latencies.append(elapsed)
+
+    total = max(1, int(rps * duration))
+    interval = 1.0 / rps
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled, questions[i % len(questions)])
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    errors = total - outcomes["ok"]
+    return {
+        "target_rps": rps,
+        "sent": total,
+        **outcomes,
+        "error_rate": errors / total,
+        "throughput_rps": outcomes["ok"] / wall,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else float("nan"),
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else float("nan"),
+        },
+    }
+
+
+def is_saturated(step: dict, slo_ms: float, max_error_rate: float) -> bool:
+    """A step is saturated when it misses its rate, its p99 SLO, or its error budget."""
+    return (
+        step["throughput_rps"] < 0.9 * step["target_rps"]
+        or step["latency_ms"]["p99"] > slo_ms
+        or step["error_rate"] > max_error_rate
+    )
+
+
+def format_report(steps: list[dict], slo_ms: float, max_error_rate: float) -> str:
+    lines = [
+        f"{'target':>8} {'sent':>6} {'ok/s':>8} {'err%':>6} {'llm':>5} {'http':>5} {'net':>5} "
+        f"{'p50ms':>8} {'p90ms':>8} {'p99ms':>8} {'maxms':>8}  saturated",
+    ]
+    saturation = None
+    for s in steps:
+        lat = s["latency_ms"]
+        saturated = is_saturated(s, slo_ms, max_error_rate)
+        if saturated and saturation is None:
+            saturation = s["target_rps"]
+        lines.append(
+            f"{s['target_rps']:>8.1f} {s['sent']:>6} {s['throughput_rps']:>8.2f} {s['error_rate'] * 100:>6.1f} "
+            f"{s['llm_errors']:>5} {s['http_errors']:>5} {s['transport_errors']:>5} "
+            f"{lat['p50']:>8.0f} {lat['p90']:>8.0f} {lat['p99']:>8.0f} {lat['max']:>8.0f}  {'yes' if saturated else ''}"
+        )
+    lines.append("")
+    if saturation is None:
+        lines.append(f"No saturation up to {steps[-1]['target_rps']} rps (p99 ≤ {slo_ms:.0f} ms, "
+                     f"errors ≤ {max_error_rate:.0%})")
+    else:
+        lines.append(f"Saturation point: {saturation} rps (p99 SLO {slo_ms:.0f} ms, error budget {max_error_rate:.0%})")
+    return "\n".join(lines)
@@ -0,0 +1,225 @@
+"""
+HemaV MedAssist — Local Stand-ins for Groq and Endee
+
+Offline fakes used by the load-test harness:
+
+- create_groq_app():   OpenAI/Groq-compatible chat completions with configurable
+                       time-to-first-token, token rate and injected 429s
+- create_endee_app():  Endee v1 HTTP API subset the app uses (index create/info/
+                       list, msgpack vector insert, msgpack search) with
+                       configurable latency; search is exact cosine in NumPy
+                       (filters are accepted but not applied)
+- FakeEmbeddingModel:  deterministic hash-seeded vectors, so the app can run
+                       without downloading the sentence-transformers model
+
+The fakes speak the same wire formats as the real services, so the app and
+the Endee/Groq SDKs run unmodified against them.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+import msgpack
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+
+# ── Groq ────────────────────────────────────────────────────
+
+def create_groq_app(latency_ms: float = 300.0, tokens_per_sec: float = 250.0,
+                    completion_tokens: int = 400, rate_429: float = 0.0,
+                    retry_after: float = 1.0) -> FastAPI:
+    """
+    Fake Groq API. Each completion takes latency_ms + completion_tokens / tokens_per_sec;
+    a `rate_429` fraction of requests is rejected with 429 + Retry-After.
+    """
+    app = FastAPI(title="Fake Groq")
+    app.state.stats = {"requests": 0, "rate_limited": 0}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.stats["requests"] += 1
+
+        if random.random() < rate_429:
+            app.state.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (fake)", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+            )
+
+        tokens = min(completion_tokens, body.get("max_tokens") or completion_tokens)
+        await asyncio.sleep(latency_ms / 1000 + tokens / tokens_per_sec)
+
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Fake answer [Source 1]. " + "token " * tokens},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": tokens,
+                "total_tokens": prompt_tokens + tokens,
+            },
+        }
+
+    # Groq SDK uses /openai/v1/..., plain OpenAI clients use /v1/...
+    app.post("/openai/v1/chat/completions")(chat_completions)
+    app.post("/v1/chat/completions")(chat_completions)
+    return app
+
+
+# ── Endee ───────────────────────────────────────────────────
+
+class _FakeIndex:
+    def __init__(self, dimension: int, space_type: str, precision: str, M: int, ef_con: int):
+        self.dimension = dimension
+        self.space_type = space_type
+        self.precision = precision
+        self.M = M
+        self.ef_con = ef_con
+        self.rows: dict[str, int] = {}
+        self.objects: list[list] = []  # [id, meta, filter, norm]
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+
+    def info(self) -> dict:
+        return {
+            "total_elements": len(self.rows),
+            "dimension": self.dimension,
+            "sparse_dim": 0,
+            "sparse_model": "None",  # what the v1 SDK checks for dense-only indexes
+            "space_type": self.space_type,
+            "precision": self.precision,
+            "checksum": -1,
+            "M": self.M,
+            "ef_con": self.ef_con,
+            "lib_token": "fake",
+        }
+
+    def insert(self, items: list[list]):
+        new_vectors = []
+        for item in items:
+            vec_id, meta, filter_str, norm, vector = item[:5]
+            vector = np.asarray(vector, dtype=np.float32)
+            length = np.linalg.norm(vector)
+            vector = vector / length if length else vector
+            if vec_id in self.rows:
+                row = self.rows[vec_id]
+                self.objects[row] = [vec_id, meta, filter_str, norm]
+                self.vectors[row] = vector
+            else:
+                self.rows[vec_id] = len(self.objects)
+                self.objects.append([vec_id, meta, filter_str, norm])
+                new_vectors.append(vector)
+        if new_vectors:
+            self.vectors = np.vstack([self.vectors, np.stack(new_vectors)])
+
+    def search(self, vector: list[float], k: int) -> list[list]:
+        if not self.objects:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        length = np.linalg.norm(query)
+        scores = self.vectors @ (query / length if length else query)
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [[float(scores[i]), *self.objects[i], []] for i in top]
+
+
+def create_endee_app(latency_ms: float = 5.0) -> FastAPI:
+    """Fake Endee server (v1 API subset). Every indexed call waits latency_ms."""
+    app = FastAPI(title="Fake Endee")
+    indexes: dict[str, _FakeIndex] = {}
+    app.state.indexes = indexes
+
+    async def delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def not_found(name: str) -> JSONResponse:
+        return JSONResponse({"error": f"Index '{name}' does not exist"}, status_code=404)
+
+    @app.get("/api/v1/health")
+    async def health():
+        return {"status": "ok", "timestamp": time.time_ns()}
+
+    @app.post("/api/v1/index/create")
+    async def create_index(request: Request):
+        body = await request.json()
+        name = body["index_name"]
+        if name in indexes:
+            return JSONResponse({"error": f"Index '{name}' already exists"}, status_code=409)
+        indexes[name] = _FakeIndex(body["dim"], body.get("space_type", "cosine"),
+                                   body.get("precision", "float16"), body.get("M", 16), body.get("ef_con", 128))
+        return Response("Index created successfully")
+
+    @app.get("/api/v1/index/list")
+    async def list_indexes():
+        return {"indexes": [{"name": name, **index.info()} for name, index in indexes.items()]}
+
+    @app.get("/api/v1/index/{name}/info")
+    async def index_info(name: str):
+        await delay()
+        if name not in indexes:
+            return not_found(name)
+        return indexes[name].info()
+
+    @app.post("/api/v1/index/{name}/vector/insert")
+    async def insert(name: str, request: Request):
+        await delay()
+        if name not in indexes:
+            return not_found(name)
+        body = await request.body()
+        if request.headers.get("content-type") == "application/msgpack":
+            items = msgpack.unpackb(body, raw=False)
+        else:
+            parsed = json.loads(body)
+            items = [
+                [o["id"], o.get("meta", b""), o.get("filter", ""), o.get("norm", 1.0), o["vector"]]
+                for o in (parsed if isinstance(parsed, list) else [parsed])
+            ]
+        indexes[name].insert(items)
+        return Response()
+
+    @app.post("/api/v1/index/{name}/search")
+    async def search(name: str, request: Request):
+        await delay()
+        if name not in indexes:
+            return not_found(name)
+        body = await request.json()
+        results = indexes[name].search(body["vector"], int(body["k"]))
+        return Response(msgpack.packb(results, use_bin_type=True), media_type="application/msgpack")
+
+    return app
+
+
+# ── Embeddings ──────────────────────────────────────────────
+
+class FakeEmbeddingModel:
+    """Drop-in for SentenceTransformer.encode with hash-seeded unit vectors."""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _embed(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, sentences, show_progress_bar: bool = False, convert_to_numpy: bool = True, **kwargs):
+        if isinstance(sentences, str):
+            return self._embed(sentences)
+        return np.stack([self._embed(s) for s in sentences]) if len(sentences) else \
+            np.empty((0, self.dimension), dtype=np.float32)
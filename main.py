@@ -7,8 +7,14 @@ Usage:
     python main.py              # Start the web server
     python main.py --ingest     # Ingest documents then start server
     python main.py --ingest-only # Only ingest, don't start server
+    python main.py --ingest-only --publish-snapshot  # Ingest, then publish an index snapshot
+    python main.py --restore-snapshot  # Restore the latest matching snapshot, then start server
+    python main.py --list-snapshots    # List published snapshots
+    python main.py --compact-embeddings  # Drop cached embeddings of chunks no longer indexed
+    python main.py --warm-answers      # Precompute answers for hot queries from the retrieval log
 """
 import argparse
+import itertools
 import logging
 import os
 import sys
@@ -26,69 +32,179 @@ logging.basicConfig(
 logger = logging.getLogger("hemav.main")
 
 
-def run_ingestion(pdf_path: str = None, directory: str = None):
-    """Run the data ingestion pipeline."""
-    from data.pdf_parser import extract_text_from_pdf, extract_from_directory
-    from data.chunker import chunk_pages
+def run_ingestion(pdf_path: str = None, directory: str = None) -> int:
+    """Run the data ingestion pipeline. Returns the number of vectors indexed."""
+    from data.pdf_parser import extract_text_from_pdf, iter_directory_pages
+    from data.chunker import build_chunk_table
     from embeddings.generator import generate_embeddings
-    from endee_integration.indexer import create_index, upsert_vectors
-    from config import DATA_DIR
+    from endee_integration.indexer import create_shard_indexes, upsert_vectors, filter_columns, write_index_version
+    from endee_integration.local_search import save_local_index
+    from endee_integration.snapshots import describe_corpus, corpus_fingerprint
+    from config import DATA_DIR, CHUNK_TABLE_PATH
 
     print(f"\n{'='*60}")
     print(f"  HemaV MedAssist — Data Ingestion Pipeline")
     print(f"{'='*60}\n")
 
-    # Determine what to ingest
+    # Describe the sources before reading them, so the recorded corpus is never newer than the index
+    corpus = describe_corpus(ingestion_paths(pdf_path, directory))
+
+    # Determine what to ingest — pages are streamed straight into the chunker
     if pdf_path:
         if not os.path.exists(pdf_path):
             print(f"  ❌ File not found: {pdf_path}")
             sys.exit(1)
         print(f"📖 Step 1: Extracting text from {pdf_path}...")
-        pages = extract_text_from_pdf(pdf_path)
+        page_sources = [extract_text_from_pdf(pdf_path)]
     elif directory:
         if not os.path.isdir(directory):
             print(f"  ❌ Directory not found: {directory}")
             sys.exit(1)
         print(f"📖 Step 1: Extracting text from all PDFs in {directory}...")
-        pages = extract_from_directory(directory)
+        page_sources = [iter_directory_pages(directory)]
     else:
         # Default: ingest data/raw/ + data/medical_docs/
-        pages = []
+        page_sources = []
 
         if os.path.isdir(DATA_DIR):
             print(f"📖 Step 1a: Extracting text from data/raw/...")
-            pages.extend(extract_from_directory(DATA_DIR))
+            page_sources.append(iter_directory_pages(DATA_DIR))
 
         from config import MEDICAL_DOCS_DIR
         if os.path.isdir(MEDICAL_DOCS_DIR):
             print(f"📖 Step 1b: Extracting text from data/medical_docs/...")
-            pages.extend(extract_from_directory(MEDICAL_DOCS_DIR))
+            page_sources.append(iter_directory_pages(MEDICAL_DOCS_DIR))
+
+    # Step 2: Chunk into a columnar table (no per-chunk dicts)
+    print("🔪 Step 2: Chunking text (500 chars, 50 overlap)...")
+    chunks = build_chunk_table(itertools.chain.from_iterable(page_sources))
 
-    if not pages:
+    if not len(chunks):
         print("  ❌ No text extracted from any source.")
         sys.exit(1)
 
-    print(f"  ✅ Extracted {len(pages)} pages total\n")
-
-    # Step 2: Chunk
-    print("🔪 Step 2: Chunking text (500 chars, 50 overlap)...")
-    chunks = chunk_pages(pages)
+    print(f"  ✅ Created {len(chunks)} chunks from {len(chunks.sources)} documents\n")
+    chunks.save(CHUNK_TABLE_PATH)
 
     # Step 3: Embed
     print("\n🧠 Step 3: Generating embeddings (all-MiniLM-L6-v2, 384-dim)...")
-    texts = [c["text"] for c in chunks]
-    embeddings = generate_embeddings(texts)
+    embeddings = generate_embeddings(chunks.texts)
     print(f"  ✅ Generated {len(embeddings)} embeddings\n")
 
     # Step 4: Index into Endee
     print("🗄️  Step 4: Indexing into Endee Vector Database...")
-    create_index()
+    create_shard_indexes()
     upsert_vectors(chunks, embeddings)
+    # New version invalidates precomputed answers; the corpus labels future snapshots
+    index_version = write_index_version(corpus=corpus, fingerprint=corpus_fingerprint(corpus),
+                                        num_vectors=len(chunks))
+
+    # Step 5: Local exact-search index (fallback / RETRIEVAL_BACKEND=local)
+    print("\n💾 Step 5: Saving local search index...")
+    save_local_index(chunks, embeddings, filter_columns(chunks), index_version)
 
     print(f"\n{'='*60}")
     print(f"  ✅ Ingestion complete! {len(chunks)} vectors indexed in Endee")
     print(f"{'='*60}\n")
 
+    return len(chunks)
+
+
+def ingestion_paths(pdf_path: str = None, directory: str = None) -> list[str]:
+    """Source paths an ingestion run reads from (recorded with the index, checked on publish)."""
+    from endee_integration.snapshots import default_corpus_paths
+
+    if pdf_path:
+        return [pdf_path]
+    if directory:
+        return [directory]
+    return default_corpus_paths()
+
+
+def publish_snapshot(paths: list[str], num_vectors: int = None):
+    """Publish a versioned snapshot of the current Endee index (refused if `paths` changed since ingestion)."""
+    from endee_integration.snapshots import publish_snapshot as _publish
+
+    print("📦 Publishing index snapshot...")
+    try:
+        manifest = _publish(paths, num_vectors=num_vectors)
+    except Exception as e:
+        print(f"  ❌ Snapshot publish failed: {e}")
+        sys.exit(1)
+    print(f"  ✅ Published snapshot '{manifest['backup_name']}'\n")
+
+
+def restore_snapshot() -> bool:
+    """Restore the latest snapshot matching the default corpus. Returns True on success."""
+    from endee_integration.snapshots import restore_latest_snapshot, restore_local_index
+    from endee_integration.indexer import write_index_version
+
+    print("📦 Looking for a matching index snapshot...")
+    manifest = restore_latest_snapshot()
+    if manifest is None:
+        print("  ⚠️ No usable snapshot found.")
+        return False
+    index_version = write_index_version(manifest["backup_name"], corpus=manifest["corpus"],
+                                        fingerprint=manifest["fingerprint"], num_vectors=manifest.get("num_vectors"))
+    if not restore_local_index(manifest, index_version):
+        print("  ⚠️ Snapshot has no local search index — no local fallback until the next ingestion")
+    print(f"  ✅ Restored snapshot '{manifest['backup_name']}' (created {manifest['created_at']})\n")
+    return True
+
+
+def list_snapshots():
+    """Print all published snapshots, newest first."""
+    from endee_integration.snapshots import list_snapshots as _list, find_latest_snapshot
+
+    snapshots = _list()
+    if not snapshots:
+        print("No snapshots found.")
+        return
+
+    latest = find_latest_snapshot()
+    for m in snapshots:
+        marker = "*" if latest and m["backup_name"] == latest["backup_name"] else " "
+        print(f"{marker} {m['backup_name']}  created={m['created_at']}  "
+              f"model={m['embedding_model']}  files={len(m['corpus'])}  vectors={m.get('num_vectors')}")
+    print("\n(* = matches current corpus and embedding model)")
+
+
+def compact_embeddings():
+    """
+    Compact the embedding store down to the chunks that are actually indexed:
+    the last ingestion's chunk table plus everything merged into the local
+    index (so earlier --file/--dir ingestions keep their vectors).
+    """
+    from data.chunk_table import ChunkTable
+    from embeddings.store import content_key, get_store
+    from config import CHUNK_TABLE_PATH, LOCAL_INDEX_DIR
+
+    tables = [path for path in (CHUNK_TABLE_PATH, os.path.join(LOCAL_INDEX_DIR, "chunks.npz")) if os.path.exists(path)]
+    if not tables:
+        print(f"  ❌ No chunk table at {CHUNK_TABLE_PATH} — run ingestion first")
+        sys.exit(1)
+
+    keep = set()
+    for path in tables:
+        keep.update(content_key(text) for text in ChunkTable.load(path).texts)
+
+    store = get_store()
+    removed = store.compact(keep=keep)
+    print(f"🧹 Compacted embedding store: removed {removed} rows, {len(store)} remain")
+
+
+def warm_answers(top_n: int, cluster_threshold: float):
+    """Precompute answers for the hottest logged query clusters."""
+    from app.answer_cache import build_answer_cache
+
+    print(f"🔥 Precomputing answers for up to {top_n} hot query clusters...")
+    try:
+        cache = build_answer_cache(top_n=top_n, cluster_threshold=cluster_threshold)
+    except RuntimeError as e:
+        print(f"  ❌ {e}")
+        sys.exit(1)
+    print(f"  ✅ Stored {len(cache['entries'])} precomputed answers (index version {cache['index_version']})\n")
+
 
 def main():
     parser = argparse.ArgumentParser(description="HemaV MedAssist — AI Medical RAG Assistant")
@@ -96,29 +212,65 @@ def main():
     parser.add_argument("--ingest-only", action="store_true", help="Only ingest documents, don't start server")
     parser.add_argument("--file", type=str, help="Path to a specific PDF to ingest")
     parser.add_argument("--dir", type=str, help="Directory of PDFs to ingest")
+    parser.add_argument("--publish-snapshot", action="store_true",
+                        help="Publish a versioned index snapshot (after ingestion, if requested)")
+    parser.add_argument("--restore-snapshot", action="store_true",
+                        help="Restore the latest matching index snapshot before starting server")
+    parser.add_argument("--list-snapshots", action="store_true", help="List published index snapshots and exit")
+    parser.add_argument("--compact-embeddings", action="store_true",
+                        help="Remove cached embeddings of chunks no longer indexed and exit")
+    parser.add_argument("--warm-answers", action="store_true",
+                        help="Precompute answers for hot queries from the retrieval log and exit")
+    parser.add_argument("--warm-top", type=int, default=200, help="Max hot query clusters to precompute (default: 200)")
+    parser.add_argument("--warm-cluster-threshold", type=float, default=0.9,
+                        help="Cosine similarity for grouping logged queries (default: 0.9)")
     parser.add_argument("--port", type=int, default=5000, help="Server port (default: 5000)")
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Server host")
     args = parser.parse_args()
 
+    if args.list_snapshots:
+        list_snapshots()
+        return
+
+    if args.compact_embeddings:
+        compact_embeddings()
+        return
+
+    if args.warm_answers:
+        warm_answers(args.warm_top, args.warm_cluster_threshold)
+        return
+
     # Run ingestion if requested
     if args.ingest or args.ingest_only:
-        run_ingestion(pdf_path=args.file, directory=args.dir)
+        num_vectors = run_ingestion(pdf_path=args.file, directory=args.dir)
+        if args.publish_snapshot:
+            publish_snapshot(ingestion_paths(args.file, args.dir), num_vectors=num_vectors)
         if args.ingest_only:
             return
+    elif args.publish_snapshot:
+        publish_snapshot(ingestion_paths(args.file, args.dir))
+        return
+    elif args.restore_snapshot:
+        if not restore_snapshot():
+            sys.exit(1)
     else:
-        # Auto-ingest if Endee is running but index doesn't exist
+        # Auto-ingest if Endee is running but an index (or shard) doesn't exist
+        from endee_integration.sharding import get_shards
+        shard = None
         try:
             from endee_integration.indexer import get_client
-            from config import INDEX_NAME
-            client = get_client()
-            client.get_index(name=INDEX_NAME)
+            for shard in get_shards():
+                get_client(shard.host).get_index(name=shard.index_name)
         except Exception as e:
             if "ConnectionError" in str(type(e)):
                 print(f"⚠️ Warning: Could not connect to Endee Vector Database.")
                 print(f"   Ensure Docker is running `endeespace/endee:latest` on port 8080.")
             else:
-                print(f"⚠️ Index '{INDEX_NAME}' not found. Running automatic ingestion...")
-                run_ingestion()
+                print(f"⚠️ Index '{shard.index_name}' not found on {shard.host}.")
+                # Fast path: restore a published snapshot; re-embed only if none matches
+                if not restore_snapshot():
+                    print("   Running automatic ingestion...")
+                    run_ingestion()
 
     # Start the web server
     print(f"\n🚀 Starting HemaV MedAssist on http://{args.host}:{args.port}")
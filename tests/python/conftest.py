@@ -0,0 +1,5 @@
+"""Make the app packages (data/, embeddings/, ...) importable from tests/python/."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,87 @@
+"""Regression tests for data/chunk_table.py (row access, take/concat, id_keys)."""
+import numpy as np
+import pytest
+
+from data.chunk_table import ChunkTable, ChunkTableBuilder
+
+
+def make_table(rows):
+    """rows: (text, source, page, page_chunk) tuples."""
+    builder = ChunkTableBuilder()
+    for text, source, page, page_chunk in rows:
+        builder.append(text, source, page, page_chunk)
+    return builder.build()
+
+
+@pytest.fixture
+def table():
+    return make_table([
+        ("alpha", "a.pdf", 1, 0),
+        ("béta ✓", "a.pdf", 1, 1),
+        ("gamma", "b.pdf", 2, 0),
+    ])
+
+
+def test_negative_indices(table):
+    assert table.texts[-1] == "gamma"
+    assert table.texts[-3] == "alpha"
+    assert table.text(-2) == "béta ✓"
+    assert table[-1]["id"] == "b.pdf_p2_c0"
+
+
+@pytest.mark.parametrize("i", [3, -4])
+def test_out_of_range(table, i):
+    with pytest.raises(IndexError):
+        table.text(i)
+    with pytest.raises(IndexError):
+        table[i]
+
+
+def test_rows_match_chunk_dicts(table):
+    assert dict(table[1]) == {"id": "a.pdf_p1_c1", "text": "béta ✓", "page": 1, "source": "a.pdf", "chunk_index": 1}
+    assert list(table.texts) == ["alpha", "béta ✓", "gamma"]
+
+
+def test_take_empty(table):
+    empty = table.take(np.array([], dtype=np.int64))
+    assert len(empty) == 0
+    assert list(empty.texts) == []
+    assert empty.offsets.tolist() == [0]
+
+
+def test_take_reorders_multibyte_text(table):
+    picked = table.take([2, 1])
+    assert list(picked.texts) == ["gamma", "béta ✓"]
+    assert [picked.chunk_id(i) for i in range(2)] == ["b.pdf_p2_c0", "a.pdf_p1_c1"]
+
+
+def test_concat_merges_sources(table):
+    other = make_table([("delta", "c.pdf", 5, 3), ("epsilon", "a.pdf", 9, 0)])
+    merged = ChunkTable.concat([table.take([0, 2]), other])
+    assert merged.sources == ["a.pdf", "b.pdf", "c.pdf"]
+    assert list(merged.texts) == ["alpha", "gamma", "delta", "epsilon"]
+    assert [merged.chunk_id(i) for i in range(len(merged))] == [
+        "a.pdf_p1_c0", "b.pdf_p2_c0", "c.pdf_p5_c3", "a.pdf_p9_c0",
+    ]
+
+
+def test_id_keys_match_exactly_when_ids_match(table):
+    new = make_table([("gamma v2", "b.pdf", 2, 0), ("other", "b.pdf", 2, 1), ("x", "c.pdf", 1, 0)])
+    sources = new.sources
+    old_keys, new_keys = table.id_keys(sources), new.id_keys(sources)
+
+    # a.pdf is not among the new sources → never matches
+    assert old_keys[:2].tolist() == [-1, -1]
+    overlap = np.isin(old_keys, new_keys)
+    assert overlap.tolist() == [False, False, True]
+
+    old_ids = {table.chunk_id(i) for i in range(len(table))}
+    new_ids = {new.chunk_id(i) for i in range(len(new))}
+    assert {table.chunk_id(i) for i in np.flatnonzero(overlap)} == old_ids & new_ids
+
+
+def test_save_load_roundtrip(table, tmp_path):
+    path = str(tmp_path / "chunks.npz")
+    table.save(path)
+    loaded = ChunkTable.load(path)
+    assert [dict(row) for row in loaded] == [dict(row) for row in table]
@@ -0,0 +1,123 @@
+"""Regression tests for embeddings/store.py (crash recovery, compaction, concurrent writers)."""
+import os
+
+import numpy as np
+import pytest
+
+from embeddings.store import EmbeddingStore, content_key
+
+DIM = 4
+
+
+def key(i) -> str:
+    return content_key(f"chunk {i}", "test-model")
+
+
+def vector(i) -> np.ndarray:
+    return np.full(DIM, float(i), dtype=np.float32)
+
+
+def open_store(root) -> EmbeddingStore:
+    return EmbeddingStore(str(root), "test-model", DIM)
+
+
+def append(store, ids):
+    store.append([key(i) for i in ids], np.stack([vector(i) for i in ids]))
+
+
+def assert_serves(store, ids):
+    for i in ids:
+        assert store.get_many([key(i)])[0].tolist() == vector(i).tolist()
+
+
+def test_roundtrip_and_contiguous_slice(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0, 1, 2])
+    reopened = open_store(tmp_path)
+    assert len(reopened) == 3
+    assert isinstance(reopened.get_many([key(0), key(1), key(2)]), np.memmap)
+    assert_serves(reopened, [0, 1, 2])
+
+
+def test_torn_key_line_is_dropped(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0, 1, 2])
+
+    # Crash mid-append of row 3: its vector landed, its key line was cut short
+    with open(store._file("vectors.f32"), "ab") as f:
+        f.write(vector(3).tobytes())
+    with open(store._file("keys.txt"), "a") as f:
+        f.write(key(3)[:7])
+
+    recovered = open_store(tmp_path)
+    assert len(recovered) == 3
+    append(recovered, [4, 5])
+
+    reopened = open_store(tmp_path)
+    assert key(3) not in reopened
+    assert_serves(reopened, [0, 1, 2, 4, 5])
+
+
+def test_trailing_vector_bytes_are_truncated(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0])
+    with open(store._file("vectors.f32"), "ab") as f:
+        f.write(b"\0" * 10)
+
+    reopened = open_store(tmp_path)
+    assert os.path.getsize(reopened._file("vectors.f32")) == DIM * 4
+    assert_serves(reopened, [0])
+
+
+def test_malformed_key_is_rejected(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0])
+    with open(store._file("vectors.f32"), "ab") as f:
+        f.write(vector(1).tobytes())
+    with open(store._file("keys.txt"), "a") as f:
+        f.write("not-a-key\n")
+
+    with pytest.raises(ValueError, match="malformed key"):
+        open_store(tmp_path)
+
+
+def test_append_catches_up_with_other_writers(tmp_path):
+    first, second = open_store(tmp_path), open_store(tmp_path)
+    append(first, [0, 1])
+    append(second, [1, 2])  # key 1 was added by `first` meanwhile → skipped
+    append(first, [3])
+
+    reopened = open_store(tmp_path)
+    assert len(reopened._keys) == 4
+    assert_serves(reopened, [0, 1, 2, 3])
+
+
+def test_compact_switches_generation(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0, 1, 2, 3])
+    old_generation = store._generation
+
+    assert store.compact(keep={key(1), key(3)}) == 2
+    assert store._generation != old_generation
+    assert not os.path.exists(os.path.join(store.path, old_generation))
+
+    reopened = open_store(tmp_path)
+    assert len(reopened) == 2
+    assert key(0) not in reopened
+    assert_serves(reopened, [1, 3])
+
+
+def test_crashed_compaction_leaves_old_generation_live(tmp_path):
+    store = open_store(tmp_path)
+    append(store, [0, 1])
+
+    # A compaction that died before switching CURRENT: an orphan, half-written generation
+    orphan = os.path.join(store.path, "gen-000002")
+    os.makedirs(orphan)
+    with open(os.path.join(orphan, "keys.txt"), "w") as f:
+        f.write(key(0) + "\n")
+
+    reopened = open_store(tmp_path)
+    assert_serves(reopened, [0, 1])
+    assert reopened.compact(keep={key(1)}) == 1
+    assert_serves(open_store(tmp_path), [1])